@@ -18,8 +18,11 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-from app.db import Base
+from app.db import Base  # importing registers the models; it creates no tables
+from app.config import settings
 target_metadata = Base.metadata
+# migrate whatever database the app is configured for (DB_URL / .env)
+config.set_main_option("sqlalchemy.url", settings.DB_URL.replace("%", "%%"))
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -9,7 +9,6 @@ from typing import Sequence, Union
 
 from alembic import op
 import sqlalchemy as sa
-from sqlalchemy.dialects import sqlite
 
 # revision identifiers, used by Alembic.
 revision: str = '1896d5057843'
@@ -20,27 +19,23 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_index(op.f('ix_queries_id'), table_name='queries')
-    op.drop_table('queries')
-    # ### end Alembic commands ###
-
-
-def downgrade() -> None:
-    """Downgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
     op.create_table('queries',
-    sa.Column('id', sa.INTEGER(), nullable=False),
-    sa.Column('input_location', sa.VARCHAR(), nullable=False),
-    sa.Column('resolved_name', sa.VARCHAR(), nullable=True),
-    sa.Column('lat', sa.FLOAT(), nullable=False),
-    sa.Column('lon', sa.FLOAT(), nullable=False),
-    sa.Column('kind', sa.VARCHAR(), nullable=False),
-    sa.Column('start_date', sa.DATE(), nullable=True),
-    sa.Column('end_date', sa.DATE(), nullable=True),
-    sa.Column('result_payload', sqlite.JSON(), nullable=True),
-    sa.Column('created_at', sa.DATETIME(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('input_location', sa.String(), nullable=False),
+    sa.Column('resolved_name', sa.String(), nullable=True),
+    sa.Column('lat', sa.Float(), nullable=False),
+    sa.Column('lon', sa.Float(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=True),
+    sa.Column('end_date', sa.Date(), nullable=True),
+    sa.Column('result_payload', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
     sa.PrimaryKeyConstraint('id')
     )
     op.create_index(op.f('ix_queries_id'), 'queries', ['id'], unique=False)
-    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_queries_id'), table_name='queries')
+    op.drop_table('queries')
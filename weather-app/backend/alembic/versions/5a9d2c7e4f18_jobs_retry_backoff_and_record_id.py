@@ -0,0 +1,31 @@
+"""jobs: retry backoff and created record id
+
+Revision ID: 5a9d2c7e4f18
+Revises: 7e3b5c1f9d60
+Create Date: 2026-10-18 18:40:12.203417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a9d2c7e4f18'
+down_revision: Union[str, Sequence[str], None] = '7e3b5c1f9d60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('run_after', sa.DateTime(), nullable=True))
+    op.add_column('jobs', sa.Column('record_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('jobs') as batch_op:
+        batch_op.drop_column('record_id')
+        batch_op.drop_column('run_after')
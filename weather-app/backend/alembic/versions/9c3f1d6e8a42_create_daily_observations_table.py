@@ -0,0 +1,39 @@
+"""create daily_observations table
+
+Revision ID: 9c3f1d6e8a42
+Revises: 4b7e2a91c3d0
+Create Date: 2026-10-18 10:41:07.552913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3f1d6e8a42'
+down_revision: Union[str, Sequence[str], None] = '4b7e2a91c3d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_observations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('loc_key', sa.String(), nullable=False),  # spatial.cell_key() of the cell's representative
+    sa.Column('lat', sa.Float(), nullable=False),
+    sa.Column('lon', sa.Float(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('values', sa.JSON(), nullable=False),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('loc_key', 'day', name='uq_daily_observations_loc_day')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_observations')
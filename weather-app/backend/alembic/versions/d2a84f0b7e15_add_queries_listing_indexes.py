@@ -0,0 +1,34 @@
+"""add queries listing indexes
+
+Revision ID: d2a84f0b7e15
+Revises: 9c3f1d6e8a42
+Create Date: 2026-10-18 13:20:51.904377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a84f0b7e15'
+down_revision: Union[str, Sequence[str], None] = '9c3f1d6e8a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_queries_created_at_id', 'queries', ['created_at', 'id'], unique=False)
+    op.create_index('ix_queries_kind_created_at', 'queries', ['kind', 'created_at'], unique=False)
+    op.create_index('ix_queries_resolved_name', 'queries', ['resolved_name'], unique=False)
+    op.create_index('ix_queries_start_end', 'queries', ['start_date', 'end_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_queries_start_end', table_name='queries')
+    op.drop_index('ix_queries_resolved_name', table_name='queries')
+    op.drop_index('ix_queries_kind_created_at', table_name='queries')
+    op.drop_index('ix_queries_created_at_id', table_name='queries')
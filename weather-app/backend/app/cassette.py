@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+import httpx
+
+# Record/replay of upstream HTTP (Open-Meteo, ipapi, YouTube, CSE). Plugged into
+# the shared AsyncClient as an httpx transport when HTTP_MODE is 'record' or
+# 'replay'; responses live in one SQLite file keyed by a normalized request key.
+
+# Credentials never take part in the key (or get written to disk); neither does the
+# CSE engine id (cx), so a replay run needs no Google settings at all
+IGNORED_PARAMS = {"key", "api_key", "apikey", "access_token", "cx"}
+
+
+def cassette_key(method: str, url: str, params: list[tuple[str, str]]) -> tuple[str, str]:
+    """(sha1 key, readable form) for a request: method, URL without query, sorted params minus credentials."""
+    items = sorted((k, v) for k, v in params if k.lower() not in IGNORED_PARAMS)
+    readable = f"{method.upper()} {url}?" + "&".join(f"{k}={v}" for k, v in items)
+    return hashlib.sha1(readable.encode()).hexdigest(), readable
+
+
+class CassetteStore:
+    """Recorded responses: key -> (status, content type, zlib-compressed body)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cassettes ("
+                "key TEXT PRIMARY KEY, request TEXT NOT NULL, status INTEGER NOT NULL, "
+                "content_type TEXT, body BLOB NOT NULL, recorded_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def get(self, key: str) -> Optional[tuple[int, str, bytes]]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT status, content_type, body FROM cassettes WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0], row[1], zlib.decompress(row[2])
+
+    def put(self, key: str, request: str, status: int, content_type: str, body: bytes) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO cassettes (key, request, status, content_type, body, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, request, status, content_type, zlib.compress(body, 6), time.time()),
+            )
+            db.commit()
+        self.recorded += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+class RecordReplayTransport(httpx.AsyncBaseTransport):
+    """
+    mode='record': forwards to `inner` and stores every non-5xx response.
+    mode='replay': answers from the store only (optionally after a simulated
+    delay); a request that was never recorded gets a 404 without touching the network.
+    """
+
+    def __init__(self, mode: str, store: CassetteStore, inner: Optional[httpx.AsyncBaseTransport] = None,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError("mode must be 'record' or 'replay'")
+        self.mode = mode
+        self.store = store
+        self.inner = inner or httpx.AsyncHTTPTransport()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url.copy_with(query=None))
+        key, readable = cassette_key(request.method, url, request.url.params.multi_items())
+
+        if self.mode == "replay":
+            if self.latency_ms or self.jitter_ms:
+                await asyncio.sleep(max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000)
+            hit = await asyncio.to_thread(self.store.get, key)
+            if hit is None:
+                body = json.dumps({"error": True, "reason": f"no recorded response for {readable}"}).encode()
+                return httpx.Response(404, headers={"content-type": "application/json"}, content=body, request=request)
+            status, content_type, body = hit
+            return httpx.Response(status, headers={"content-type": content_type}, content=body, request=request)
+
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()  # decoded (no content-encoding) from here on
+        await response.aclose()
+        content_type = response.headers.get("content-type", "application/json")
+        if response.status_code < 500:
+            await asyncio.to_thread(self.store.put, key, readable, response.status_code, content_type, body)
+        return httpx.Response(response.status_code, headers={"content-type": content_type},
+                              content=body, request=request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+        self.store.close()
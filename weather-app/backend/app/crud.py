@@ -1,5 +1,9 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+import base64
+from datetime import date, datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy import select, delete, func, and_, or_
 from .models import QueryRecord
 
 def create_record(db: Session, rec: QueryRecord) -> QueryRecord:
@@ -11,9 +15,124 @@ def create_record(db: Session, rec: QueryRecord) -> QueryRecord:
 def get_record(db: Session, record_id: int) -> QueryRecord | None:
     return db.get(QueryRecord, record_id)
 
-def list_records(db: Session) -> list[QueryRecord]:
-    return db.execute(select(QueryRecord).order_by(QueryRecord.created_at.desc())).scalars().all()
+def get_record_payload(db: Session, record_id: int) -> tuple[bool, dict | None]:
+    """(found, result_payload) reading only the payload column."""
+    row = db.execute(select(QueryRecord.result_payload).where(QueryRecord.id == record_id)).one_or_none()
+    return (False, None) if row is None else (True, row[0])
+
+# --- listing: keyset pagination on (created_at, id), newest first ---
+def encode_cursor(rec: QueryRecord) -> str:
+    raw = f"{rec.created_at.isoformat()}|{rec.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises ValueError on a malformed cursor."""
+    try:
+        created_at, rec_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(rec_id)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+def record_filters(kind: str | None = None, name_prefix: str | None = None,
+                    from_date: date | None = None, to_date: date | None = None) -> list:
+    conds = []
+    if kind:
+        conds.append(QueryRecord.kind == kind)
+    if name_prefix:
+        # a range rather than LIKE: SQLite cannot use ix_queries_resolved_name for LIKE ... ESCAPE
+        # (case-sensitive prefix match, as LIKE is on Postgres)
+        conds.append(and_(QueryRecord.resolved_name >= name_prefix,
+                          QueryRecord.resolved_name < name_prefix + "\U0010ffff"))
+    # records whose [start_date, end_date] overlaps [from_date, to_date]
+    if to_date:
+        conds.append(QueryRecord.start_date <= to_date)
+    if from_date:
+        conds.append(QueryRecord.end_date >= from_date)
+    return conds
+
+def list_query(limit: int = 100, cursor: str | None = None, **filters):
+    conds = record_filters(**filters)
+    if cursor:
+        created_at, rec_id = decode_cursor(cursor)
+        conds.append(or_(
+            QueryRecord.created_at < created_at,
+            and_(QueryRecord.created_at == created_at, QueryRecord.id < rec_id),
+        ))
+    return (
+        select(QueryRecord)
+        .where(*conds)
+        .order_by(QueryRecord.created_at.desc(), QueryRecord.id.desc())
+        .limit(limit)
+    )
+
+def list_records(db: Session, limit: int = 100, cursor: str | None = None, **filters) -> list[QueryRecord]:
+    return db.execute(list_query(limit, cursor, **filters)).scalars().all()
+
+def count_query(**filters):
+    return select(func.count()).select_from(QueryRecord).where(*record_filters(**filters))
+
+def count_records(db: Session, **filters) -> int:
+    return db.execute(count_query(**filters)).scalar_one()
 
 def delete_record(db: Session, rec: QueryRecord) -> None:
     db.delete(rec)
     db.commit()
+
+
+# --- async variants (AsyncSession); result_payload is never lazy-loaded here,
+# ask for it with with_payload=True ---
+async def create_record_async(db: AsyncSession, rec: QueryRecord) -> QueryRecord:
+    db.add(rec)
+    await db.commit()
+    await db.refresh(rec)
+    return rec
+
+async def get_record_async(db: AsyncSession, record_id: int, with_payload: bool = False) -> QueryRecord | None:
+    options = [undefer(QueryRecord.result_payload)] if with_payload else []
+    return await db.get(QueryRecord, record_id, options=options)
+
+async def get_record_payload_async(db: AsyncSession, record_id: int) -> tuple[bool, dict | None]:
+    row = (await db.execute(select(QueryRecord.result_payload).where(QueryRecord.id == record_id))).one_or_none()
+    return (False, None) if row is None else (True, row[0])
+
+async def list_records_async(db: AsyncSession, limit: int = 100, cursor: str | None = None, **filters) -> list[QueryRecord]:
+    return (await db.execute(list_query(limit, cursor, **filters))).scalars().all()
+
+async def count_records_async(db: AsyncSession, **filters) -> int:
+    return (await db.execute(count_query(**filters))).scalar_one()
+
+async def delete_record_async(db: AsyncSession, rec: QueryRecord) -> None:
+    await db.delete(rec)
+    await db.commit()
+
+# --- bulk (one transaction per call) ---
+_ID_CHUNK = 500  # ids per IN (...) so large batches stay under bound-parameter limits
+
+async def create_records_async(db: AsyncSession, recs: list[QueryRecord]) -> list[QueryRecord]:
+    """Inserts all rows in batched INSERTs and commits once; ids are set on the returned objects."""
+    db.add_all(recs)
+    await db.commit()
+    return recs
+
+async def get_records_async(db: AsyncSession, ids: list[int], with_payload: bool = False) -> dict[int, QueryRecord]:
+    options = [undefer(QueryRecord.result_payload)] if with_payload else []
+    out: dict[int, QueryRecord] = {}
+    for i in range(0, len(ids), _ID_CHUNK):
+        stmt = select(QueryRecord).where(QueryRecord.id.in_(ids[i:i + _ID_CHUNK])).options(*options)
+        out.update((rec.id, rec) for rec in (await db.execute(stmt)).scalars())
+    return out
+
+async def delete_records_async(db: AsyncSession, ids: list[int] | None = None, **filters) -> list[int]:
+    """DELETE ... WHERE by ids and/or record_filters in one transaction; returns the deleted ids."""
+    conds = record_filters(**filters)
+    if not conds and not ids:
+        raise ValueError("refusing to delete every record: no ids and no filters")
+    chunks = [ids[i:i + _ID_CHUNK] for i in range(0, len(ids), _ID_CHUNK)] if ids else [None]
+    deleted: list[int] = []
+    for chunk in chunks:
+        where = conds + ([QueryRecord.id.in_(chunk)] if chunk is not None else [])
+        stmt = (delete(QueryRecord).where(*where).returning(QueryRecord.id)
+                .execution_options(synchronize_session=False))
+        deleted.extend(r[0] for r in await db.execute(stmt))
+    await db.commit()
+    return deleted
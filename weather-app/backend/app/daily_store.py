@@ -0,0 +1,151 @@
+import asyncio
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from .config import settings
+from .db import SessionLocal
+from .models import DailyObservation
+from .spatial import spatial_index
+from .timeseries import DailySeries
+from .weather_utils import get_archive_range, get_forecast_range
+
+# Normalized per-(grid cell, day) store behind /weather/range.
+# Past days never change, so archive rows are kept forever; forecast rows
+# expire after FORECAST_STORE_TTL and are refetched.
+
+FETCHERS = {"archive": get_archive_range, "forecast": get_forecast_range}
+
+# Set by background jobs (jobs.py): called with the number of requested days
+# that became available (already stored, or a chunk that just arrived).
+days_progress: ContextVar[Optional[Callable[[int], None]]] = ContextVar("days_progress", default=None)
+
+
+def _report(days: int) -> None:
+    cb = days_progress.get()
+    if cb is not None and days:
+        cb(days)
+
+
+def load_days(key: str, s: date, e: date, source: str) -> DailySeries:
+    """Stored days of [s, e] from `source`; stale forecast rows are ignored."""
+    stmt = select(DailyObservation.day, DailyObservation.values).where(
+        DailyObservation.loc_key == key,
+        DailyObservation.day >= s,
+        DailyObservation.day <= e,
+        DailyObservation.source == source,
+    )
+    if source == "forecast":
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.FORECAST_STORE_TTL)
+        stmt = stmt.where(DailyObservation.fetched_at >= cutoff)
+    with SessionLocal() as db:
+        return DailySeries.from_days({day: values for day, values in db.execute(stmt)})
+
+
+def _upsert(dialect: str):
+    """INSERT ... ON CONFLICT for dialects that have it, else None."""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    stmt = insert(DailyObservation)
+    return stmt.on_conflict_do_update(
+        index_elements=[DailyObservation.loc_key, DailyObservation.day],
+        set_={"source": stmt.excluded.source, "values": stmt.excluded["values"],
+              "fetched_at": stmt.excluded.fetched_at},
+    )
+
+
+def save_days(key: str, lat: float, lon: float, series: DailySeries, source: str) -> None:
+    """
+    Upsert one row per day of `series`; an archive row replaces an older forecast row for the
+    same day. Concurrent writers of overlapping days each keep all of their other days.
+    """
+    if not len(series):
+        return
+    now = datetime.utcnow()
+    rows = [dict(loc_key=key, lat=lat, lon=lon, day=day, source=source, values=values, fetched_at=now)
+            for day, values in series.to_days().items()]
+    with SessionLocal() as db:
+        stmt = _upsert(db.get_bind().dialect.name)
+        if stmt is not None:
+            db.execute(stmt, rows)
+        else:
+            # no ON CONFLICT: one SAVEPOINT per row, so a conflict only skips that day
+            for row in rows:
+                try:
+                    with db.begin_nested():
+                        obs = db.execute(select(DailyObservation).where(
+                            DailyObservation.loc_key == key, DailyObservation.day == row["day"])).scalar_one_or_none()
+                        if obs is None:
+                            db.add(DailyObservation(**row))
+                        else:
+                            obs.source, obs.values, obs.fetched_at = source, row["values"], now
+                except IntegrityError:
+                    pass  # a concurrent writer stored this day first; theirs is just as good
+        db.commit()
+    spatial_index.register(key, lat, lon)
+
+
+def split_chunks(ranges: list[tuple[date, date]], chunk_days: int) -> list[tuple[date, date]]:
+    """Cuts each (s, e) into consecutive pieces of at most `chunk_days` days."""
+    out = []
+    for s, e in ranges:
+        while s <= e:
+            ce = min(e, s + timedelta(days=chunk_days - 1))
+            out.append((s, ce))
+            s = ce + timedelta(days=1)
+    return out
+
+
+def retryable(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)  # timeouts, resets, ...
+
+
+async def _fetch_chunk(key: str, lat: float, lon: float, s: date, e: date, source: str,
+                       sem: asyncio.Semaphore) -> DailySeries:
+    """One chunk with its own retries; stored as soon as it arrives so a later failure keeps it."""
+    fetcher = FETCHERS[source]
+    for attempt in range(settings.ARCHIVE_CHUNK_RETRIES + 1):
+        try:
+            async with sem:
+                data = await fetcher(lat, lon, s, e)
+            break
+        except httpx.HTTPError as exc:
+            if attempt == settings.ARCHIVE_CHUNK_RETRIES or not retryable(exc):
+                raise
+            await asyncio.sleep(settings.ARCHIVE_RETRY_BACKOFF * 2 ** attempt)
+    series = DailySeries.from_daily(data.get("daily"))
+    to_store = series.non_empty() if source == "archive" else series
+    await asyncio.to_thread(save_days, key, lat, lon, to_store, source)
+    _report((e - s).days + 1)
+    return series
+
+
+async def fetch_days(lat: float, lon: float, s: date, e: date, source: str) -> DailySeries:
+    """
+    Series for [s, e]: stored days come from the DB, only the gaps go upstream.
+    Long archive gaps are split into ARCHIVE_CHUNK_DAYS pieces fetched in parallel
+    (at most ARCHIVE_CHUNK_CONCURRENCY at once), each retried on its own.
+    Archive days that come back all-null (not yet published upstream) are returned but not stored.
+    The location is snapped to its grid cell first, so nearby coordinates share stored days.
+    """
+    key, lat, lon = spatial_index.snap(lat, lon)
+    have = await asyncio.to_thread(load_days, key, s, e, source)
+    _report(len(have))
+    gaps = have.missing_ranges(s, e)
+    if not gaps:
+        return have
+    if source == "archive":
+        gaps = split_chunks(gaps, settings.ARCHIVE_CHUNK_DAYS)
+    sem = asyncio.Semaphore(settings.ARCHIVE_CHUNK_CONCURRENCY)
+    chunks = await asyncio.gather(*(_fetch_chunk(key, lat, lon, gs, ge, source, sem) for gs, ge in gaps))
+    return DailySeries.concat([have, *chunks])
@@ -1,20 +1,161 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from .config import settings
+from .metrics import db_query_time, db_session_time
+from .profiling import add_timing
 
-engine = create_engine(settings.DB_URL, echo=False, future=True)
+
+
+_SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def _sqlite_pragmas(dbapi_conn, _record) -> None:
+    sync = settings.SQLITE_SYNCHRONOUS.upper()
+    if sync not in _SYNCHRONOUS_LEVELS:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {sorted(_SYNCHRONOUS_LEVELS)}")
+    cur = dbapi_conn.cursor()
+    if settings.SQLITE_WAL:
+        cur.execute("PRAGMA journal_mode=WAL")  # readers no longer block the writer
+    cur.execute(f"PRAGMA synchronous={sync}")
+    cur.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_KB)}")  # negative = KiB
+    cur.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_BYTES)}")
+    cur.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cur.close()
+
+
+def _engine_kwargs(url: URL) -> tuple[dict, bool]:
+    """(create_engine kwargs, whether SQLite pragmas apply) for `url`, shared by the sync and async engines."""
+    kwargs: dict = {"echo": False}
+    if url.get_backend_name() == "sqlite":
+        in_memory = url.database in (None, "", ":memory:")
+        kwargs["connect_args"] = {"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if not in_memory:
+            kwargs.update(pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW,
+                          pool_timeout=settings.DB_POOL_TIMEOUT)
+        return kwargs, not in_memory
+    kwargs.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    return kwargs, False
+
+
+def make_engine(url: str | None = None, **overrides) -> Engine:
+    """
+    Engine for `url` (default DB_URL) tuned from Settings:
+      - SQLite files: WAL, synchronous level, page cache, mmap and busy timeout
+        set on every new connection, and usable from the threadpool;
+      - server databases (Postgres, MySQL): pool size/overflow/timeout/recycle and pre-ping.
+    `overrides` go straight to create_engine.
+    """
+    url = make_url(url or settings.DB_URL)
+    kwargs, pragmas = _engine_kwargs(url)
+    kwargs.update(overrides)
+    eng = create_engine(url, **kwargs)
+    if pragmas:
+        event.listen(eng, "connect", _sqlite_pragmas)
+    return eng
+
+
+# ---------- async engine (records router) ----------
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+
+def async_url(url: str) -> URL:
+    """DB_URL with its driver swapped for the asyncio one (sqlite -> aiosqlite, postgresql -> asyncpg)."""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    driver = u.drivername.partition("+")[2]  # explicit driver only; the default one may be sync
+    if driver in ("aiosqlite", "asyncpg", "aiomysql", "asyncmy", "psycopg") or backend not in _ASYNC_DRIVERS:
+        return u
+    return u.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+
+
+def make_async_engine(url: str | None = None, **overrides) -> AsyncEngine:
+    """Async counterpart of make_engine; ASYNC_DB_URL wins over the URL derived from DB_URL."""
+    url = make_url(url) if url else make_url(settings.ASYNC_DB_URL) if settings.ASYNC_DB_URL else async_url(settings.DB_URL)
+    kwargs, pragmas = _engine_kwargs(url)
+    kwargs.update(overrides)
+    eng = create_async_engine(url, **kwargs)
+    if pragmas:
+        event.listen(eng.sync_engine, "connect", _sqlite_pragmas)
+    return eng
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# created on first use, so the sync-only tools do not need the async driver installed
+_async_engine: AsyncEngine | None = None
+_AsyncSessionLocal: async_sessionmaker[AsyncSession] | None = None
 Base = declarative_base()
 
-# Import models so metadata is populated, then create tables 
+# Import models so metadata is populated; tables are created by init_db() or Alembic
 from . import models  
-Base.metadata.create_all(bind=engine)
+
+
+def init_db() -> None:
+    """
+    Creates missing tables at startup for databases Alembic does not manage.
+    Once `alembic upgrade head` has run (alembic_version exists), the migrations
+    own the schema and this does nothing.
+    """
+    if not inspect(engine).has_table("alembic_version"):
+        Base.metadata.create_all(bind=engine)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_start(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_t0", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_end(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_t0"].pop()
+    db_query_time.observe(elapsed, statement.lstrip().split(None, 1)[0].lower())
+    add_timing("db", elapsed)
 
 
 def get_db():
     session = SessionLocal()
+    t0 = time.perf_counter()
     try:
         yield session
     finally:
         session.close()
+        db_session_time.observe(time.perf_counter() - t0)
+
+
+def async_session_factory() -> async_sessionmaker[AsyncSession]:
+    global _async_engine, _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        _async_engine = make_async_engine()
+        # expire_on_commit=False: returned records stay readable after commit without lazy IO
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _AsyncSessionLocal
+
+
+async def get_async_db():
+    """
+    Request-scoped AsyncSession. A connection is only checked out at the first
+    statement and returned at commit/rollback, not held for the whole request.
+    """
+    async with async_session_factory()() as session:
+        t0 = time.perf_counter()
+        try:
+            yield session
+        finally:
+            db_session_time.observe(time.perf_counter() - t0)
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine, _AsyncSessionLocal = None, None
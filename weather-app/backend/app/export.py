@@ -0,0 +1,161 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Iterator
+from xml.sax.saxutils import escape
+
+from sqlalchemy import select
+
+from .crud import record_filters
+from .db import SessionLocal
+from .models import QueryRecord
+from .timeseries import DailySeries
+
+# Streaming writers behind GET /records/export. Rows come from a server-side
+# cursor in batches, so memory stays flat however large `queries` gets.
+
+RECORD_COLUMNS = ["id", "created_at", "input_location", "resolved_name", "lat", "lon", "kind", "start_date", "end_date"]
+# every daily variable /weather/range can return (forecast vars are a superset of archive vars)
+DAILY_COLUMNS = ["day", "weathercode", "temperature_2m_max", "temperature_2m_min", "precipitation_sum", "windspeed_10m_max"]
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "json": ("application/json", "json"),
+    "xml": ("application/xml", "xml"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+BATCH_ROWS = 500
+
+
+def columns(expand: bool) -> list[str]:
+    return RECORD_COLUMNS + (DAILY_COLUMNS if expand else [])
+
+
+def _plain(v):
+    return v.isoformat() if isinstance(v, (date, datetime)) else v
+
+
+def iter_rows(expand: bool = False, **filters) -> Iterator[dict]:
+    """Records (newest first) as flat dicts; with expand, one dict per stored day instead."""
+    cols = [getattr(QueryRecord, c) for c in RECORD_COLUMNS]
+    if expand:
+        cols.append(QueryRecord.result_payload)
+    stmt = (
+        select(*cols)
+        .where(*record_filters(**filters))
+        .order_by(QueryRecord.created_at.desc(), QueryRecord.id.desc())
+        .execution_options(stream_results=True, yield_per=BATCH_ROWS)
+    )
+    with SessionLocal() as db:
+        for row in db.execute(stmt):
+            rec = {c: _plain(row[i]) for i, c in enumerate(RECORD_COLUMNS)}
+            if not expand:
+                yield rec
+                continue
+            series = DailySeries.from_daily((row[-1] or {}).get("daily"))
+            for day, values in series.iter_rows(DAILY_COLUMNS[1:]):
+                yield dict(rec, day=day, **dict(zip(DAILY_COLUMNS[1:], values)))
+
+
+def _batched(rows: Iterator[dict], n: int = BATCH_ROWS) -> Iterator[list[dict]]:
+    batch = []
+    for r in rows:
+        batch.append(r)
+        if len(batch) >= n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_csv(rows: Iterator[dict], cols: list[str]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=cols, extrasaction="ignore")
+    writer.writeheader()
+    for batch in _batched(rows):
+        writer.writerows(batch)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+
+def stream_ndjson(rows: Iterator[dict], cols: list[str]) -> Iterator[str]:
+    for batch in _batched(rows):
+        yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch)
+
+
+def stream_json(rows: Iterator[dict], cols: list[str]) -> Iterator[str]:
+    yield "["
+    first = True
+    for batch in _batched(rows):
+        chunk = ",\n".join(json.dumps(r, ensure_ascii=False) for r in batch)
+        yield ("\n" if first else ",\n") + chunk
+        first = False
+    yield "\n]\n"
+
+
+def stream_xml(rows: Iterator[dict], cols: list[str]) -> Iterator[str]:
+    yield "<records>\n"
+    for batch in _batched(rows):
+        parts = []
+        for r in batch:
+            parts.append("  <record>")
+            for k in cols:
+                v = r.get(k)
+                parts.append(f"    <{k}>{'' if v is None else escape(str(v))}</{k}>")
+            parts.append("  </record>")
+        yield "\n".join(parts) + "\n"
+    yield "</records>\n"
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose written bytes are drained after each row group."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        self.pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.pos
+
+    def drain(self) -> bytes:
+        out = b"".join(self.chunks)
+        self.chunks.clear()
+        return out
+
+
+def stream_parquet(rows: Iterator[dict], cols: list[str]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {"id": pa.int64(), "lat": pa.float64(), "lon": pa.float64()}
+    for v in DAILY_COLUMNS[1:]:
+        types[v] = pa.float64()
+    schema = pa.schema([(c, types.get(c, pa.string())) for c in cols])
+
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in _batched(rows, 5000):
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+WRITERS = {
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+    "json": stream_json,
+    "xml": stream_xml,
+    "parquet": stream_parquet,
+}
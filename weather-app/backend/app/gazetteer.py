@@ -0,0 +1,111 @@
+import bisect
+import gzip
+import heapq
+from functools import lru_cache
+from typing import Optional
+
+from .geocode_cache import normalize_query
+
+# Offline place lookup from a GeoNames cities dump (cities500/1000/5000/15000.txt,
+# optionally gzipped). Names live in one sorted array of normalized keys; a prefix
+# query is two bisects plus a population-ranked top-k over the matching slice.
+
+# GeoNames "geoname" table columns we use
+_NAME, _ASCII, _LAT, _LON, _CC, _ADMIN1, _POP = 1, 2, 4, 5, 8, 10, 14
+
+
+class Gazetteer:
+    def __init__(self):
+        self.names: list[str] = []
+        self.country: list[str] = []
+        self.admin1: list[str] = []
+        self.lat: list[float] = []
+        self.lon: list[float] = []
+        self.population: list[int] = []
+        self._keys: list[str] = []  # sorted normalized names
+        self._ids: list[int] = []   # place index for each key
+        # per instance (load() re-runs __init__): a class-level lru_cache would be keyed on
+        # self, keep every instance alive and survive reloads
+        self._top = lru_cache(maxsize=4096)(self._top_uncached)
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.names)
+
+    def load(self, path: str, min_population: int = 0) -> int:
+        """Reads a GeoNames TSV; returns the number of places loaded."""
+        self.__init__()
+        opener = gzip.open if path.endswith(".gz") else open
+        pairs = []
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) <= _POP:
+                    continue
+                pop = int(cols[_POP] or 0)
+                if pop < min_population:
+                    continue
+                i = len(self.names)
+                self.names.append(cols[_NAME])
+                self.country.append(cols[_CC])
+                self.admin1.append(cols[_ADMIN1])
+                self.lat.append(float(cols[_LAT]))
+                self.lon.append(float(cols[_LON]))
+                self.population.append(pop)
+                for key in {normalize_query(cols[_NAME]), normalize_query(cols[_ASCII])}:
+                    if key:
+                        pairs.append((key, i))
+        pairs.sort()
+        self._keys = [k for k, _ in pairs]
+        self._ids = [i for _, i in pairs]
+        return len(self.names)
+
+    def _range(self, prefix: str) -> tuple[int, int]:
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix + "\uffff", lo)
+        return lo, hi
+
+    def _top_uncached(self, prefix: str, limit: int) -> tuple[int, ...]:
+        lo, hi = self._range(prefix)
+        ids = dict.fromkeys(self._ids[lo:hi])  # a place can match by name and ascii name
+        return tuple(heapq.nlargest(limit, ids, key=self.population.__getitem__))
+
+    def place(self, i: int) -> dict:
+        return {
+            "name": f"{self.names[i]}, {self.country[i]}",
+            "lat": self.lat[i],
+            "lon": self.lon[i],
+            "country_code": self.country[i],
+            "population": self.population[i],
+        }
+
+    def autocomplete(self, q: str, limit: int = 10) -> list[dict]:
+        prefix = normalize_query(q)
+        if not prefix or not self.loaded:
+            return []
+        return [self.place(i) for i in self._top(prefix, limit)]
+
+    def lookup(self, q: str) -> Optional[dict]:
+        """
+        Most populous exact name match, also accepting a trailing country or
+        admin1 code ('Paris FR', 'Austin, TX'); None when unsure.
+        """
+        key = normalize_query(q)
+        if not key or not self.loaded:
+            return None
+        best = self._best(key)
+        if best is None and " " in key:
+            name, qualifier = key.rsplit(" ", 1)
+            best = self._best(name, qualifier)
+        return None if best is None else {k: v for k, v in self.place(best).items() if k in ("name", "lat", "lon")}
+
+    def _best(self, key: str, qualifier: str | None = None) -> Optional[int]:
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_right(self._keys, key, lo)
+        ids = self._ids[lo:hi]
+        if qualifier:
+            ids = [i for i in ids if qualifier in (self.country[i].lower(), self.admin1[i].lower())]
+        return max(ids, key=self.population.__getitem__) if ids else None
+
+
+gazetteer = Gazetteer()
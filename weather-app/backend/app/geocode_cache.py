@@ -0,0 +1,110 @@
+import re
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from .cache import LRUCache
+from .config import settings
+from .db import SessionLocal
+from .models import GeocodeCacheEntry
+
+MISS = object()
+
+
+def normalize_query(query: str) -> str:
+    """'  Austin,  TX. ' -> 'austin tx' (case, whitespace and punctuation insensitive)."""
+    q = unicodedata.normalize("NFKC", query or "").casefold()
+    q = re.sub(r"[^\w\s]", " ", q)
+    return " ".join(q.split())
+
+
+class GeocodeCache:
+    """
+    Two tiers: bounded in-memory LRU in front of the `geocode_cache` table.
+    Values are the geocode() result dict, or None for "location not found"
+    (negative entries expire after GEOCODE_NEGATIVE_TTL seconds).
+    """
+
+    def __init__(self, maxsize: int, negative_ttl: float):
+        self.memory = LRUCache(maxsize=maxsize)
+        self.negative_ttl = negative_ttl
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        """Returns the cached value (dict or None) or MISS when neither tier has it."""
+        value = self.get_memory(key)
+        return value if value is not MISS else self.get_disk(key)
+
+    def get_memory(self, key: str):
+        """Memory tier only: cheap enough to call on the event loop."""
+        value = self.memory.get(key, MISS)
+        if value is not MISS:
+            self.memory_hits += 1
+        return value
+
+    def get_disk(self, key: str):
+        """Disk tier, for keys get_memory() missed; blocking, so run it in a thread from async code."""
+        value = self._disk_get(key)
+        if value is not MISS:
+            self.disk_hits += 1
+            self._remember(key, value)
+            return value
+        self.misses += 1
+        return MISS
+
+    def set(self, key: str, value: Optional[dict]) -> None:
+        self._remember(key, value)
+        self._disk_set(key, value)
+
+    def _remember(self, key: str, value: Optional[dict]) -> None:
+        self.memory.set(key, value, ttl=None if value is not None else self.negative_ttl)
+
+    # --- disk tier ---
+    def _disk_get(self, key: str):
+        with SessionLocal() as db:
+            row = db.get(GeocodeCacheEntry, key)
+            if row is None:
+                return MISS
+            if row.expires_at is not None and row.expires_at < datetime.utcnow():
+                db.delete(row)
+                db.commit()
+                return MISS
+            if not row.found:
+                return None
+            return {"name": row.name, "lat": row.lat, "lon": row.lon}
+
+    def _disk_set(self, key: str, value: Optional[dict]) -> None:
+        now = datetime.utcnow()
+        row = GeocodeCacheEntry(
+            key=key,
+            found=value is not None,
+            name=value["name"] if value else None,
+            lat=value["lat"] if value else None,
+            lon=value["lon"] if value else None,
+            created_at=now,
+            expires_at=None if value is not None else now + timedelta(seconds=self.negative_ttl),
+        )
+        with SessionLocal() as db:
+            try:
+                db.merge(row)
+                db.commit()
+            except IntegrityError:
+                # a concurrent miss for the same query inserted it first; update that row instead
+                db.rollback()
+                db.merge(row)
+                db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_size": len(self.memory),
+        }
+
+
+geocode_cache = GeocodeCache(settings.GEOCODE_CACHE_SIZE, settings.GEOCODE_NEGATIVE_TTL)
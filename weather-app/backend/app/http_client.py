@@ -0,0 +1,79 @@
+import time
+import httpx
+from typing import Optional
+from urllib.parse import urlsplit
+
+from .cassette import CassetteStore, RecordReplayTransport
+from .config import settings
+from .metrics import upstream_latency, upstream_requests
+from .profiling import add_timing
+from .singleflight import SingleFlight, request_key
+
+# One keep-alive pool shared by every upstream call (Open-Meteo, ipapi, ...)
+_client: Optional[httpx.AsyncClient] = None
+# Identical upstream GETs in flight at the same time share one call
+upstream_flights = SingleFlight()
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide AsyncClient, creating it lazily on first use.
+    Pool size and timeouts come from Settings (HTTP_*).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            transport=_make_transport(),
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+        )
+    return _client
+
+
+def _make_transport() -> httpx.AsyncBaseTransport:
+    """Pooled network transport, wrapped for record/replay when HTTP_MODE asks for it."""
+    transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    ))
+    if settings.HTTP_MODE == "live":
+        return transport
+    return RecordReplayTransport(
+        settings.HTTP_MODE, CassetteStore(settings.CASSETTE_PATH), inner=transport,
+        latency_ms=settings.REPLAY_LATENCY_MS, jitter_ms=settings.REPLAY_JITTER_MS,
+    )
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def get_json(url: str, params: Optional[dict] = None, timeout: Optional[float] = None,
+                   site: str = "other") -> dict:
+    """
+    GET `url` through the shared pool and return the decoded JSON body (raises on HTTP errors).
+    `site` names the call site for the upstream latency/status metrics.
+    """
+    kwargs = {"params": params}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+
+    async def _fetch():
+        host = urlsplit(url).hostname or "unknown"
+        status = "error"
+        t0 = time.perf_counter()
+        try:
+            r = await get_client().get(url, **kwargs)
+            status = str(r.status_code)
+            r.raise_for_status()
+            return r.json()
+        finally:
+            elapsed = time.perf_counter() - t0
+            upstream_latency.observe(elapsed, host, site)
+            upstream_requests.inc(host, site, status)
+            add_timing(f"upstream_{site}", elapsed)
+
+    return await upstream_flights.do(request_key(url, params), _fetch)
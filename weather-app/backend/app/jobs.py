@@ -0,0 +1,282 @@
+"""
+Background jobs persisted in the `jobs` table.
+
+POST /jobs/... inserts a 'queued' row and returns its id; workers claim rows
+oldest first with a conditional UPDATE (so several processes can share one
+queue), run them and write progress, result or error back. A running job
+writes a heartbeat every JOB_HEARTBEAT seconds; one whose worker died is put
+back in the queue after JOB_STALE_AFTER.
+
+JOB_BACKEND='local' runs JOB_WORKERS workers inside the API process and wakes
+them on submit; 'external' leaves the queue to `python -m app.worker`.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import undefer
+
+from .config import settings
+from .crud import get_record_async
+from .daily_store import days_progress, retryable
+from .db import async_session_factory
+from .models import Job
+from .schemas import RangeRequest, RecordCreate, RecordOut
+from .routers.weather import range_weather
+from .routers.records import create_payload, new_record
+
+log = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+Progress = Callable[[float, Optional[str]], None]
+
+
+# ---------- handlers: kind -> (params model, coroutine(params, progress, job) -> result) ----------
+async def _run_range(body: RangeRequest, progress: Progress, job: Job) -> dict:
+    return await range_weather(body)
+
+
+async def _run_record(body: RecordCreate, progress: Progress, job: Job) -> dict:
+    """
+    Creates the record and stores its id on the job in one transaction, so a
+    rerun (worker died before marking the job done) returns it instead of a duplicate.
+    """
+    if job.record_id is not None:
+        async with async_session_factory()() as db:
+            rec = await get_record_async(db, job.record_id)
+        if rec is not None:
+            return RecordOut.model_validate(rec).model_dump(mode="json")
+    payload = await create_payload(body)
+    progress(0.95, "saving record")
+    async with async_session_factory()() as db:
+        rec = new_record(body, payload)
+        db.add(rec)
+        await db.flush()
+        await db.execute(update(Job).where(Job.id == job.id).values(record_id=rec.id))
+        await db.commit()
+    return RecordOut.model_validate(rec).model_dump(mode="json")
+
+
+HANDLERS: dict[str, tuple[type, Callable[..., Awaitable[dict]]]] = {
+    "range": (RangeRequest, _run_range),
+    "record": (RecordCreate, _run_record),
+}
+
+
+# ---------- queue ----------
+async def submit(kind: str, params: dict) -> Job:
+    if kind not in HANDLERS:
+        raise ValueError(f"unknown job kind {kind!r}")
+    job = Job(id=uuid.uuid4().hex, kind=kind, status="queued", params=params, progress=0.0, attempts=0)
+    async with async_session_factory()() as db:
+        db.add(job)
+        await db.commit()
+    runner.wake()
+    return job
+
+
+async def get_job(job_id: str, with_result: bool = False) -> Job | None:
+    stmt = select(Job).where(Job.id == job_id)
+    if with_result:
+        stmt = stmt.options(undefer(Job.result))
+    async with async_session_factory()() as db:
+        return (await db.execute(stmt)).scalar_one_or_none()
+
+
+async def _update(job_id: str, **values) -> None:
+    async with async_session_factory()() as db:
+        await db.execute(update(Job).where(Job.id == job_id).values(**values))
+        await db.commit()
+
+
+async def claim_next() -> Job | None:
+    """Oldest queued job, marked running by this worker; None if the queue is empty."""
+    async with async_session_factory()() as db:
+        while True:
+            now = datetime.utcnow()
+            job = (await db.execute(
+                select(Job)
+                .where(Job.status == "queued", or_(Job.run_after.is_(None), Job.run_after <= now))
+                .order_by(Job.created_at).limit(1)
+            )).scalar_one_or_none()
+            if job is None:
+                return None
+            claimed = await db.execute(
+                update(Job).where(Job.id == job.id, Job.status == "queued").values(
+                    status="running", worker=WORKER_ID, started_at=now, heartbeat_at=now, run_after=None,
+                    attempts=Job.attempts + 1, error=None, message="started")
+            )
+            await db.commit()
+            if claimed.rowcount == 1:
+                await db.refresh(job)
+                return job
+            # another worker got it first; try the next one
+
+
+async def requeue_stale() -> int:
+    """Running jobs whose worker stopped heartbeating go back to the queue (or fail after JOB_MAX_ATTEMPTS)."""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.JOB_STALE_AFTER)
+    stale = (Job.status == "running", Job.heartbeat_at < cutoff)
+    async with async_session_factory()() as db:
+        failed = await db.execute(update(Job).where(*stale, Job.attempts >= settings.JOB_MAX_ATTEMPTS).values(
+            status="failed", error="worker stopped responding", finished_at=datetime.utcnow()))
+        requeued = await db.execute(update(Job).where(*stale).values(
+            status="queued", worker=None, message="requeued: worker stopped responding"))
+        await db.commit()
+    return failed.rowcount + requeued.rowcount
+
+
+# ---------- running a job ----------
+def _describe(exc: BaseException) -> str:
+    if isinstance(exc, HTTPException):
+        return f"{exc.status_code}: {exc.detail}"
+    if isinstance(exc, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+    return f"{type(exc).__name__}: {str(exc).splitlines()[0] if str(exc) else ''}"
+
+
+def _should_retry(exc: BaseException) -> bool:
+    if isinstance(exc, HTTPException):
+        return exc.status_code in (502, 503, 504)
+    if isinstance(exc, asyncio.CancelledError):
+        return True  # cancelled from below (e.g. a coalesced upstream call), not a shutdown
+    return retryable(exc)
+
+
+async def _failed(job: Job, exc: BaseException) -> None:
+    """Back to the queue after a JOB_RETRY_BACKOFF delay (doubled per attempt), or failed for good."""
+    if _should_retry(exc) and job.attempts < settings.JOB_MAX_ATTEMPTS:
+        delay = settings.JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+        await _update(job.id, status="queued", worker=None, error=_describe(exc),
+                      run_after=datetime.utcnow() + timedelta(seconds=delay),
+                      message=f"retrying in {delay:g}s after attempt {job.attempts}")
+        return
+    if not isinstance(exc, (HTTPException, ValidationError, asyncio.CancelledError)) and not retryable(exc):
+        log.error("job %s (%s) failed", job.id, job.kind, exc_info=exc)
+    await _update(job.id, status="failed", error=_describe(exc), message=None, finished_at=datetime.utcnow())
+
+
+def _total_days(params: dict) -> int:
+    try:
+        s, e = date.fromisoformat(params["start_date"]), date.fromisoformat(params["end_date"])
+    except (KeyError, TypeError, ValueError):
+        return 0
+    return max((e - s).days + 1, 0)
+
+
+async def run_job(job: Job) -> None:
+    model, handler = HANDLERS[job.kind]
+    total = _total_days(job.params)
+    state = {"progress": 0.0, "message": "started", "days": 0}
+
+    def progress(frac: float, message: str | None = None) -> None:
+        state["progress"] = max(state["progress"], min(frac, 0.99))
+        if message:
+            state["message"] = message
+
+    def on_days(n: int) -> None:
+        # stored/fetched days of the range so far, reported by daily_store
+        state["days"] += n
+        if total:
+            progress(0.9 * min(state["days"] / total, 1.0), f"{min(state['days'], total)}/{total} days")
+
+    async def heartbeat() -> None:
+        # progress goes out with the heartbeat, so chunk callbacks never wait on the DB;
+        # a failed write (e.g. database is locked) must not stop the beats, or the job gets requeued
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT)
+            try:
+                await _update(job.id, heartbeat_at=datetime.utcnow(),
+                              progress=state["progress"], message=state["message"])
+            except Exception:
+                log.warning("job %s: heartbeat failed", job.id, exc_info=True)
+
+    token = days_progress.set(on_days)
+    hb = asyncio.create_task(heartbeat())
+    try:
+        result = await handler(model(**job.params), progress, job)
+    except asyncio.CancelledError as exc:
+        if not asyncio.current_task().cancelling():
+            await _failed(job, exc)
+            return
+        # shutdown: hand the job back to the queue for the next worker
+        await asyncio.shield(_update(job.id, status="queued", worker=None, message="requeued on shutdown"))
+        raise
+    except Exception as exc:
+        await _failed(job, exc)
+    else:
+        await _update(job.id, status="done", progress=1.0, message=None, error=None,
+                      result=result, finished_at=datetime.utcnow())
+    finally:
+        hb.cancel()
+        days_progress.reset(token)
+
+
+class JobRunner:
+    """
+    N worker tasks pulling from the jobs table, plus one task requeueing stale
+    jobs every JOB_SWEEP_INTERVAL; wake() skips the poll wait after a local submit.
+    """
+
+    def __init__(self):
+        self._tasks: list[asyncio.Task] = []
+        self._wake: asyncio.Event | None = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self, workers: int) -> None:
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._loop(), name=f"job-worker-{i}") for i in range(workers)]
+        self._tasks.append(asyncio.create_task(self._sweep(), name="job-sweeper"))
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _loop(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                job = await claim_next()
+            except Exception:
+                log.exception("job queue unavailable")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await run_job(job)
+            except Exception:
+                log.exception("job %s: could not record outcome", job.id)  # stale recovery picks it up
+
+    async def _sweep(self) -> None:
+        # on its own timer: busy workers never reach an empty poll, and a dead worker's job must not wait for one
+        while True:
+            try:
+                if await requeue_stale():
+                    self.wake()
+            except Exception:
+                log.exception("stale job sweep failed")
+            await asyncio.sleep(settings.JOB_SWEEP_INTERVAL)
+
+
+runner = JobRunner()
@@ -1,7 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .db import Base, engine
-from .routers import weather, records, integrations
+from fastapi.responses import PlainTextResponse
+from .db import init_db, dispose_async_engine
+from .http_client import close_client
+from .spatial import spatial_index
+from .gazetteer import gazetteer
+from .config import settings
+from .metrics import MetricsMiddleware, registry, stats_collector
+from .profiling import ProfilingMiddleware
+from .jobs import runner as job_runner
+from .routers import weather, records, integrations, jobs
 
 app = FastAPI(title="Weather Backend (Tech Assessment 2)")
 
@@ -11,7 +19,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "Server-Timing", "X-Profile-Id"],
 )
+if settings.PROFILE_SECRET or settings.PROFILE_SAMPLE_EVERY:
+    app.add_middleware(ProfilingMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Basic root + health endpoints
 @app.get("/", tags=["root"])
@@ -22,12 +35,49 @@ def root():
 def health():
     return {"status": "ok"}
 
+@app.get("/metrics", tags=["root"], response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+def _cache_stats() -> dict:
+    s = weather.cache_stats()
+    g = s["geocode"]
+    return {
+        "geocode": {"hits": g["memory_hits"] + g["disk_hits"], "misses": g["misses"]},
+        "current": s["current"],
+        "forecast": s["forecast"],
+        "stats": s["stats"],
+    }
+
+stats_collector("cache", "Cache lookups", _cache_stats, ("hits", "misses"))
+stats_collector("upstream_singleflight", "Upstream GETs run vs. coalesced into an in-flight call",
+                lambda: {"upstream": weather.upstream_flights.stats()}, ("calls", "coalesced"), label="pool")
+
 # Routers
 app.include_router(weather.router)
 app.include_router(records.router)
 app.include_router(integrations.router)
+app.include_router(jobs.router)
 
 
 @app.on_event("startup")
 def on_startup():
-    Base.metadata.create_all(bind=engine)
+    init_db()
+    spatial_index.warm()
+    if settings.GAZETTEER_PATH:
+        gazetteer.load(settings.GAZETTEER_PATH, settings.GAZETTEER_MIN_POPULATION)
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    if settings.JOB_BACKEND == "local":
+        job_runner.start(settings.JOB_WORKERS)
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await job_runner.stop()  # running jobs go back to the queue
+    await close_client()
+    await dispose_async_engine()
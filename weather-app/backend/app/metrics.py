@@ -0,0 +1,178 @@
+import bisect
+import threading
+import time
+from typing import Callable, Iterable
+
+# Minimal Prometheus text-format metrics (no client library). Hot-path cost is a
+# perf_counter pair, a bisect and a few dict updates under a lock; cache and
+# single-flight counters are read from their own stats() only when scraped.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = ()):
+        self.name, self.doc, self.labelnames = name, doc, labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = list(self._values.items())
+        for labels, v in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_num(v)}"
+
+
+class Gauge(Counter):
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> Iterable[str]:
+        lines = list(super().render())
+        lines[1] = f"# TYPE {self.name} gauge"
+        if not self._values:
+            lines.append(f"{self.name} 0")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.doc, self.labelnames = name, doc, labels
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            s[i] += 1
+            s[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        names = self.labelnames + ("le",)
+        for labels, s in items:
+            cumulative = 0
+            for b, c in zip(self.buckets + (float("inf"),), s):
+                cumulative += c
+                le = "+Inf" if b == float("inf") else _num(b)
+                yield f"{self.name}_bucket{_labels(names, labels + (le,))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {repr(s[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: list[Callable[[], Iterable[str]]] = []
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], Iterable[str]]):
+        """Registers a function yielding exposition lines at scrape time."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        for fn in self._collectors:
+            lines.extend(fn())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.add(Counter(
+    "http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")))
+http_latency = registry.add(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("route", "method")))
+http_in_flight = registry.add(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served."))
+upstream_requests = registry.add(Counter(
+    "upstream_requests_total", "Upstream HTTP calls by host, call site and status.", ("host", "site", "status")))
+upstream_latency = registry.add(Histogram(
+    "upstream_request_duration_seconds", "Upstream HTTP call latency by host and call site.", ("host", "site")))
+db_session_time = registry.add(Histogram(
+    "db_session_duration_seconds", "Lifetime of request-scoped DB sessions (get_db)."))
+db_query_time = registry.add(Histogram(
+    "db_query_duration_seconds", "DB statement execution time by statement type.", ("op",)))
+
+
+def stats_collector(name: str, doc: str, sources: Callable[[], dict[str, dict]],
+                    fields: tuple[str, ...], label: str = "cache") -> None:
+    """
+    Exposes counters that already live in some object's stats() dict, e.g.
+    {"geocode": {"hits": 3, "misses": 1}} -> name_hits_total{cache="geocode"} 3.
+    """
+    def collect():
+        snapshot = sources()
+        for f in fields:
+            metric = f"{name}_{f}_total"
+            yield f"# HELP {metric} {doc} ({f})."
+            yield f"# TYPE {metric} counter"
+            for key, stats in snapshot.items():
+                if f in stats:
+                    yield f'{metric}{{{label}="{_escape(key)}"}} {_num(stats[f])}'
+    registry.collector(collect)
+
+
+# ---------- ASGI middleware ----------
+class MetricsMiddleware:
+    """Per-route latency/status and in-flight gauge; routes are labelled by path template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = [500]
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            elapsed = time.perf_counter() - t0
+            http_in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_latency.observe(elapsed, path, method)
+            http_requests.inc(path, method, str(status[0]))
@@ -1,10 +1,16 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Float, Date, DateTime, Integer, JSON
+from sqlalchemy import String, Float, Date, DateTime, Integer, JSON, Boolean, UniqueConstraint, Index
 from datetime import datetime
 from .db import Base
 
 class QueryRecord(Base):
     __tablename__ = "queries"
+    __table_args__ = (
+        Index("ix_queries_created_at_id", "created_at", "id"),  # keyset pagination order
+        Index("ix_queries_kind_created_at", "kind", "created_at"),
+        Index("ix_queries_resolved_name", "resolved_name"),
+        Index("ix_queries_start_end", "start_date", "end_date"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     input_location: Mapped[str] = mapped_column(String, nullable=False)
     resolved_name: Mapped[str | None] = mapped_column(String)
@@ -13,5 +19,49 @@ class QueryRecord(Base):
     kind: Mapped[str] = mapped_column(String, nullable=False)  # 'current'|'forecast'|'range'
     start_date: Mapped[Date | None] = mapped_column(Date)
     end_date: Mapped[Date | None] = mapped_column(Date)
-    result_payload: Mapped[dict | None] = mapped_column(JSON)
+    result_payload: Mapped[dict | None] = mapped_column(JSON, deferred=True)  # loaded on access only
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class GeocodeCacheEntry(Base):
+    __tablename__ = "geocode_cache"
+    key: Mapped[str] = mapped_column(String, primary_key=True)  # normalized query
+    found: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    name: Mapped[str | None] = mapped_column(String)
+    lat: Mapped[float | None] = mapped_column(Float)
+    lon: Mapped[float | None] = mapped_column(Float)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    expires_at: Mapped[datetime | None] = mapped_column(DateTime)  # None = never (positive hits)
+
+class DailyObservation(Base):
+    """One day of daily weather variables for one location (see daily_store.py)."""
+    __tablename__ = "daily_observations"
+    __table_args__ = (UniqueConstraint("loc_key", "day", name="uq_daily_observations_loc_day"),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    loc_key: Mapped[str] = mapped_column(String, nullable=False)  # spatial.cell_key(lat, lon)
+    lat: Mapped[float] = mapped_column(Float, nullable=False)
+    lon: Mapped[float] = mapped_column(Float, nullable=False)
+    day: Mapped[Date] = mapped_column(Date, nullable=False)
+    source: Mapped[str] = mapped_column(String, nullable=False)  # 'archive'|'forecast'
+    values: Mapped[dict] = mapped_column(JSON, nullable=False)    # {variable: value}
+    fetched_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class Job(Base):
+    """Background job (see jobs.py): a queued range fetch or record creation."""
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_created_at", "status", "created_at"),)
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)  # uuid4 hex
+    kind: Mapped[str] = mapped_column(String, nullable=False)       # 'range'|'record'
+    status: Mapped[str] = mapped_column(String, nullable=False)     # 'queued'|'running'|'done'|'failed'
+    params: Mapped[dict] = mapped_column(JSON, nullable=False)      # request body
+    progress: Mapped[float] = mapped_column(Float, default=0.0)     # 0..1
+    message: Mapped[str | None] = mapped_column(String)
+    result: Mapped[dict | None] = mapped_column(JSON, deferred=True)
+    error: Mapped[str | None] = mapped_column(String)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    worker: Mapped[str | None] = mapped_column(String)              # host:pid that claimed it
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime)
+    run_after: Mapped[datetime | None] = mapped_column(DateTime)    # retry backoff: not claimed before this
+    record_id: Mapped[int | None] = mapped_column(Integer)          # 'record' jobs: the record already created
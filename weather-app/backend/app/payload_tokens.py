@@ -0,0 +1,46 @@
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from datetime import date
+
+from .config import settings
+from .geocode_cache import normalize_query
+
+# Short-lived HMAC tokens that vouch for a /weather/range payload, so that
+# POST /records can persist the payload the client already has instead of
+# fetching it again. Without PAYLOAD_TOKEN_SECRET a per-process secret is
+# used (tokens then simply stop verifying after a restart).
+
+_SECRET = (settings.PAYLOAD_TOKEN_SECRET or secrets.token_hex(32)).encode()
+
+
+def _fingerprint(payload: dict, input_location: str, s: date, e: date) -> str:
+    canonical = json.dumps(
+        {"payload": payload, "loc": normalize_query(input_location), "s": s.isoformat(), "e": e.isoformat()},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _sign(expires: int, fingerprint: str) -> str:
+    return hmac.new(_SECRET, f"{expires}.{fingerprint}".encode(), hashlib.sha256).hexdigest()
+
+
+def issue(payload: dict, input_location: str, s: date, e: date) -> str:
+    expires = int(time.time() + settings.PAYLOAD_TOKEN_TTL)
+    return f"{expires}.{_sign(expires, _fingerprint(payload, input_location, s, e))}"
+
+
+def verify(token: str, payload: dict, input_location: str, s: date, e: date) -> bool:
+    """True only for an unexpired token issued for exactly this payload, location and range."""
+    try:
+        expires_s, sig = token.split(".", 1)
+        expires = int(expires_s)
+    except (AttributeError, ValueError):
+        return False
+    if expires < time.time():
+        return False
+    expected = _sign(expires, _fingerprint(payload, input_location, s, e))
+    return hmac.compare_digest(sig, expected)
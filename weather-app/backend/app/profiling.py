@@ -0,0 +1,106 @@
+import asyncio
+import cProfile
+import hmac
+import itertools
+import json
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from .config import settings
+
+# Opt-in per-request profiling. A request is profiled when it carries
+# `X-Profile: <PROFILE_SECRET>` or is picked by 1-in-PROFILE_SAMPLE_EVERY
+# sampling; its cProfile stats go to PROFILE_DIR as <id>.prof next to a <id>.json
+# with the Server-Timing breakdown. tools/profile_report.py aggregates them.
+#
+# cProfile sees the whole event-loop thread, so other requests running
+# concurrently show up in the same dump; work in to_thread()/threadpool
+# is not profiled, but its time still lands in the db/upstream breakdown.
+
+# Per-request breakdown {name: seconds}; None outside a profiled request
+_timings: ContextVar[Optional[dict]] = ContextVar("request_timings", default=None)
+_seen = itertools.count(1)     # requests considered for sampling
+_counter = itertools.count(1)  # profile ids
+_active = False  # only one cProfile can be enabled at a time
+
+
+def add_timing(name: str, seconds: float) -> None:
+    """Adds to the current profiled request's breakdown; a no-op otherwise."""
+    t = _timings.get()
+    if t is not None:
+        t[name] = t.get(name, 0.0) + seconds
+
+
+def _wanted(scope) -> bool:
+    if settings.PROFILE_SECRET:
+        for k, v in scope["headers"]:
+            if k == b"x-profile" and hmac.compare_digest(v, settings.PROFILE_SECRET.encode()):
+                return True
+    n = settings.PROFILE_SAMPLE_EVERY
+    return bool(n) and next(_seen) % n == 0
+
+
+def server_timing(timings: dict) -> str:
+    return ", ".join(f"{k};dur={v * 1000:.1f}" for k, v in timings.items())
+
+
+def _dump(prof: cProfile.Profile, profile_id: str, meta: dict) -> None:
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    base = os.path.join(settings.PROFILE_DIR, profile_id)
+    prof.dump_stats(base + ".prof")
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+class ProfilingMiddleware:
+    """Only installed when PROFILE_SECRET or PROFILE_SAMPLE_EVERY is set (see main.py)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _active
+        if scope["type"] != "http" or _active or not _wanted(scope):
+            return await self.app(scope, receive, send)
+
+        _active = True
+        timings: dict = {}
+        token = _timings.set(timings)
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(_counter)}"
+        status = [500]
+        t0 = time.perf_counter()
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                breakdown = {**timings, "app": time.perf_counter() - t0}
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"server-timing", server_timing(breakdown).encode()),
+                    (b"x-profile-id", profile_id.encode()),
+                ]
+            await send(message)
+
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            prof.disable()
+            _active = False
+            _timings.reset(token)
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            meta = {
+                "id": profile_id,
+                "method": scope["method"],
+                "route": route,
+                "path": scope["path"],
+                "status": status[0],
+                "timings_ms": {k: round(v * 1000, 2) for k, v in
+                               {**timings, "total": time.perf_counter() - t0}.items()},
+                "at": time.time(),
+            }
+            await asyncio.to_thread(_dump, prof, re.sub(r"[^\w.-]", "_", profile_id), meta)
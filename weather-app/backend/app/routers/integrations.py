@@ -1,29 +1,26 @@
 from fastapi import APIRouter, HTTPException
-import requests, urllib.parse
+import urllib.parse
 from ..config import settings
+from ..http_client import get_json
 
 router = APIRouter(prefix="/integrations", tags=["integrations"])
 
 @router.get("/youtube")
-def youtube_search(q: str, max_results: int = 6):
-    if not settings.YT_API_KEY:
+async def youtube_search(q: str, max_results: int = 6):
+    if not settings.YT_API_KEY and settings.HTTP_MODE != "replay":
         raise HTTPException(400, "YouTube API key missing in .env")
-    r = requests.get("https://www.googleapis.com/youtube/v3/search", params={
+    return await get_json("https://www.googleapis.com/youtube/v3/search", params={
         "part":"snippet","q":q,"type":"video","maxResults":max_results,
         "key":settings.YT_API_KEY,"safeSearch":"moderate"
-    }, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    }, timeout=20, site="youtube")
 
 @router.get("/google-search")
-def google_search(q: str, num: int = 5):
-    if not settings.CSE_API_KEY or not settings.CSE_CX:
+async def google_search(q: str, num: int = 5):
+    if (not settings.CSE_API_KEY or not settings.CSE_CX) and settings.HTTP_MODE != "replay":
         raise HTTPException(400, "Google CSE API key/CX missing in .env")
-    r = requests.get("https://www.googleapis.com/customsearch/v1", params={
+    return await get_json("https://www.googleapis.com/customsearch/v1", params={
         "key": settings.CSE_API_KEY, "cx": settings.CSE_CX, "q": q, "num": num, "safe":"active"
-    }, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    }, timeout=20, site="google_search")
 
 @router.get("/map-embed")
 def map_embed(lat: float | None = None, lon: float | None = None, q: str | None = None):
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException, Response
+
+from .. import jobs
+from ..models import Job
+from ..schemas import JobOut, RangeRequest, RecordCreate
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def _job_out(job: Job, with_result: bool = False) -> JobOut:
+    # result is deferred; only touch it when it was loaded
+    fields = {k: getattr(job, k) for k in JobOut.model_fields if k != "result"}
+    return JobOut(**fields, result=job.result if with_result else None)
+
+
+async def _submit(kind: str, params: dict, response: Response) -> JobOut:
+    job = await jobs.submit(kind, params)
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return _job_out(job)
+
+
+@router.post("/range", response_model=JobOut, status_code=202)
+async def submit_range(body: RangeRequest, response: Response):
+    """Same body as POST /weather/range; the result is that endpoint's response."""
+    return await _submit("range", body.model_dump(mode="json"), response)
+
+
+@router.post("/records", response_model=JobOut, status_code=202)
+async def submit_record(body: RecordCreate, response: Response):
+    """Same body as POST /records; the result is the created record."""
+    return await _submit("record", body.model_dump(mode="json"), response)
+
+
+@router.get("/{job_id}", response_model=JobOut)
+async def get_job(job_id: str, include_result: bool = True):
+    job = await jobs.get_job(job_id, with_result=include_result)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return _job_out(job, with_result=include_result)
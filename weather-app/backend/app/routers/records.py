@@ -1,31 +1,248 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..db import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, timedelta
+import asyncio
+import logging
+import httpx
+from pydantic import ValidationError
+from ..config import settings
+from ..db import get_async_db
+from .. import payload_tokens
 from ..models import QueryRecord
-from ..schemas import RecordCreate, RecordOut, RecordUpdate, RangeRequest
-from ..crud import create_record, get_record, list_records, delete_record
-from .weather import range_weather  # reuse for re-fetch logic
+from ..schemas import (
+    RecordCreate, RecordOut, RecordUpdate, RangeRequest, WeatherPayload,
+    RecordBulkUpdate, BulkItemResult, BulkResult, BulkDeleteOut,
+)
+from ..crud import (
+    create_record_async, get_record_async, get_record_payload_async, list_records_async,
+    count_records_async, delete_record_async, encode_cursor,
+    create_records_async, get_records_async, delete_records_async, record_filters,
+)
+from .weather import range_weather, fetch_range  # reuse for re-fetch logic
+from ..weather_utils import geocode as base_geocode
+from ..geocode_cache import normalize_query
+from ..spatial import cell_key
+from ..timeseries import DailySeries
+from ..export import FORMATS, WRITERS, columns, iter_rows
 
+log = logging.getLogger(__name__)
 router = APIRouter(prefix="/records", tags=["records"])
 
 @router.get("/", response_model=list[RecordOut])
-def api_list_records(db: Session = Depends(get_db)):
-    return list_records(db)
+async def api_list_records(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    kind: str | None = None,
+    name_prefix: str | None = None,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    with_total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Newest first, one page at a time. The next page's cursor is returned in the
+    X-Next-Cursor header (absent on the last page); with_total=true adds X-Total-Count.
+    from_date/to_date keep records whose date range overlaps them.
+    """
+    filters = dict(kind=kind, name_prefix=name_prefix, from_date=from_date, to_date=to_date)
+    try:
+        rows = await list_records_async(db, limit=limit, cursor=cursor, **filters)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1])
+    if with_total:
+        response.headers["X-Total-Count"] = str(await count_records_async(db, **filters))
+    return rows
+
+@router.get("/export")
+def api_export_records(
+    format: str = "csv",
+    expand: bool = False,
+    kind: str | None = None,
+    name_prefix: str | None = None,
+    from_date: date | None = None,
+    to_date: date | None = None,
+):
+    """
+    Streams every matching record as csv | ndjson | json | xml | parquet.
+    expand=true writes one row per stored day of result_payload instead of one per record.
+    """
+    if format not in FORMATS:
+        raise HTTPException(400, f"format must be one of: {', '.join(FORMATS)}")
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(501, "Parquet export needs 'pyarrow' installed on the backend")
+    media_type, ext = FORMATS[format]
+    rows = iter_rows(expand=expand, kind=kind, name_prefix=name_prefix, from_date=from_date, to_date=to_date)
+    return StreamingResponse(
+        WRITERS[format](rows, columns(expand)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="weather_records.{ext}"'},
+    )
+
+# --- bulk: one transaction per request, per-item results ---
+def _check_bulk_size(n: int) -> None:
+    if n > settings.BULK_MAX_ITEMS:
+        raise HTTPException(400, f"At most {settings.BULK_MAX_ITEMS} items per bulk request")
+
+def _item_error(exc: Exception) -> tuple[int, str]:
+    if isinstance(exc, HTTPException):
+        return exc.status_code, str(exc.detail)
+    if isinstance(exc, httpx.HTTPError):
+        return 502, f"Upstream error: {exc}"
+    if isinstance(exc, ValidationError):  # e.g. end_date before start_date
+        return 400, "; ".join(e["msg"] for e in exc.errors())
+    # anything else is a bug or a broken upstream/DB: fail this item, keep the others
+    log.error("bulk item failed", exc_info=exc)
+    return 500, "Internal error"
+
+def _bulk_result(results: dict[int, BulkItemResult]) -> BulkResult:
+    ordered = [results[i] for i in sorted(results)]
+    ok = sum(r.ok for r in ordered)
+    return BulkResult(ok=ok, failed=len(ordered) - ok, results=ordered)
+
+@router.post("/bulk", response_model=BulkResult)
+async def api_bulk_create(items: list[RecordCreate], db: AsyncSession = Depends(get_async_db)):
+    """
+    Creates many records with one batched insert. Payloads are fetched concurrently
+    (BATCH_CONCURRENCY at a time, identical location/range items once); items that
+    fail are reported and skipped, the rest are stored.
+    """
+    _check_bulk_size(len(items))
+    groups: dict[tuple, list[int]] = {}
+    for i, item in enumerate(items):
+        key = (normalize_query(item.input_location), item.start_date, item.end_date)
+        groups.setdefault(key, []).append(i)
+
+    sem = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+    payloads: dict[int, dict] = {}
+    results: dict[int, BulkItemResult] = {}
+
+    async def _one(indices: list[int]) -> None:
+        try:
+            async with sem:
+                payload = await create_payload(items[indices[0]])
+        except Exception as exc:
+            status, error = _item_error(exc)
+            for i in indices:
+                results[i] = BulkItemResult(index=i, ok=False, status=status, error=error)
+            return
+        for i in indices:
+            payloads[i] = payload
+
+    await asyncio.gather(*(_one(indices) for indices in groups.values()))
+    order = sorted(payloads)
+    recs = await create_records_async(db, [new_record(items[i], payloads[i]) for i in order])
+    for i, rec in zip(order, recs):
+        results[i] = BulkItemResult(index=i, ok=True, id=rec.id)
+    return _bulk_result(results)
+
+@router.patch("/bulk", response_model=BulkResult)
+async def api_bulk_update(items: list[RecordBulkUpdate], db: AsyncSession = Depends(get_async_db)):
+    """
+    Applies many updates in one transaction. Refetches run concurrently with no
+    connection held; every item is planned against the stored record, so if an
+    id appears twice the later item wins.
+    """
+    _check_bulk_size(len(items))
+    recs = await get_records_async(db, list({item.id for item in items}), with_payload=True)
+    results: dict[int, BulkItemResult] = {}
+    plans: dict[int, tuple] = {}
+    for i, item in enumerate(items):
+        rec = recs.get(item.id)
+        if rec is None:
+            results[i] = BulkItemResult(index=i, ok=False, id=item.id, status=404, error="Record not found")
+            continue
+        try:
+            plans[i] = (*plan_update(rec, item), rec.result_payload)
+        except HTTPException as exc:
+            results[i] = BulkItemResult(index=i, ok=False, id=item.id, status=exc.status_code, error=exc.detail)
+    await db.rollback()
+
+    sem = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+    final: dict[int, dict] = {}
+
+    async def _one(i: int) -> None:
+        old, merged, changes, stored_payload = plans[i]
+        try:
+            async with sem:
+                final[i] = await refetch_changes(old, merged, changes, stored_payload, items[i].refetch)
+        except Exception as exc:
+            status, error = _item_error(exc)
+            results[i] = BulkItemResult(index=i, ok=False, id=items[i].id, status=status, error=error)
+
+    await asyncio.gather(*(_one(i) for i in plans))
+    if final:
+        recs = await get_records_async(db, list({items[i].id for i in final}))
+        for i in sorted(final):
+            rec = recs.get(items[i].id)
+            if rec is None:  # deleted while we were fetching
+                results[i] = BulkItemResult(index=i, ok=False, id=items[i].id, status=404, error="Record not found")
+                continue
+            for k, v in final[i].items():
+                setattr(rec, k, v)
+            results[i] = BulkItemResult(index=i, ok=True, id=rec.id)
+        await db.commit()
+    return _bulk_result(results)
+
+@router.delete("/bulk", response_model=BulkDeleteOut)
+async def api_bulk_delete(
+    ids: list[int] | None = Query(None),
+    kind: str | None = Query(None, min_length=1),         # blank values would match everything
+    name_prefix: str | None = Query(None, min_length=1),
+    from_date: date | None = None,
+    to_date: date | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    One DELETE ... WHERE for ids (?ids=1&ids=2) and/or the listing filters, combined
+    with AND; at least one is required. `missing` lists requested ids that were not deleted.
+    """
+    filters = dict(kind=kind, name_prefix=name_prefix, from_date=from_date, to_date=to_date)
+    if not ids and not record_filters(**filters):
+        raise HTTPException(422, "Give ids and/or at least one filter")
+    _check_bulk_size(len(ids or []))
+    deleted = await delete_records_async(db, ids=ids, **filters)
+    return {"deleted": len(deleted), "ids": sorted(deleted), "missing": sorted(set(ids or []) - set(deleted))}
 
 @router.get("/{record_id}", response_model=RecordOut)
-def api_get_record(record_id: int, db: Session = Depends(get_db)):
-    rec = get_record(db, record_id)
+async def api_get_record(record_id: int, db: AsyncSession = Depends(get_async_db)):
+    rec = await get_record_async(db, record_id)
     if not rec:
         raise HTTPException(404, "Record not found")
     return rec
 
-@router.post("/", response_model=RecordOut)
-def api_create_record(body: RecordCreate, db: Session = Depends(get_db)):
+@router.get("/{record_id}/payload", response_model=WeatherPayload, response_model_exclude_none=True)
+async def api_get_record_payload(record_id: int, fields: str | None = None, db: AsyncSession = Depends(get_async_db)):
+    """Stored result_payload; `fields=time,temperature_2m_max` keeps only those daily columns."""
+    found, payload = await get_record_payload_async(db, record_id)
+    if not found:
+        raise HTTPException(404, "Record not found")
+    payload = payload or {}
+    if fields and isinstance(payload.get("daily"), dict):
+        wanted = {f.strip() for f in fields.split(",") if f.strip()}
+        payload = {**payload, "daily": {k: v for k, v in payload["daily"].items() if k in wanted}}
+    return {"payload": payload}
+
+async def create_payload(body: RecordCreate) -> dict:
+    """result_payload for a new record: the client's token-verified payload, or a fresh fetch."""
+    if body.result_payload and body.payload_token and payload_tokens.verify(
+        body.payload_token, body.result_payload, body.input_location, body.start_date, body.end_date
+    ):
+        # client already fetched this exact range via /weather/range
+        return body.result_payload
     # Validate location & range by calling weather.range (will raise on error)
     rr = RangeRequest(input_location=body.input_location, start_date=body.start_date, end_date=body.end_date)
-    payload = range_weather(rr)["payload"]
+    return (await range_weather(rr))["payload"]
+
+def new_record(body: RecordCreate, payload: dict) -> QueryRecord:
     resolved = payload.get("resolved", {})
-    rec = QueryRecord(
+    return QueryRecord(
         input_location=body.input_location.strip(),
         resolved_name=resolved.get("name"),
         lat=resolved.get("lat"),
@@ -35,47 +252,89 @@ def api_create_record(body: RecordCreate, db: Session = Depends(get_db)):
         end_date=body.end_date,
         result_payload=payload
     )
-    return create_record(db, rec)
+
+@router.post("/", response_model=RecordOut)
+async def api_create_record(body: RecordCreate, db: AsyncSession = Depends(get_async_db)):
+    # the session has no connection until the insert below, so none is held during the fetch
+    payload = await create_payload(body)
+    return await create_record_async(db, new_record(body, payload))
+
+async def derive_payload(old: dict, new: dict, stored_payload: dict | None) -> dict | None:
+    """
+    New result_payload for a range record going from `old` to `new`
+    ({input_location, lat, lon, resolved_name, start_date, end_date}), or None if unchanged.
+    A new input_location always gets its own `resolved` block; only a move to another grid
+    cell refetches every day. Otherwise stored days older than ARCHIVE_LAG_DAYS are reused
+    and the rest of the range (added days, recent or forecast days) is fetched again.
+    """
+    s, e = new["start_date"], new["end_date"]
+    g = {"name": old["resolved_name"], "lat": old["lat"], "lon": old["lon"]}
+    moved = normalize_query(new["input_location"]) != normalize_query(old["input_location"])
+    if not moved and (s, e) == (old["start_date"], old["end_date"]):
+        return None
+    if moved:
+        g = await base_geocode(new["input_location"])
+        if not g:
+            raise HTTPException(404, "Location not found")
+
+    daily = (stored_payload or {}).get("daily")
+    if not daily or cell_key(g["lat"], g["lon"]) != cell_key(old["lat"], old["lon"]):
+        return (await fetch_range(g, s, e))["payload"]
+
+    # days this recent may have been stored as forecast or not yet be final in the archive
+    settled = date.today() - timedelta(days=settings.ARCHIVE_LAG_DAYS + 1)
+    stored = DailySeries.from_daily(daily).slice(s, min(e, settled)).non_empty()
+    gaps = stored.missing_ranges(s, e)
+    fetched = await asyncio.gather(*(fetch_range(g, gs, ge) for gs, ge in gaps))
+    series = DailySeries.concat([stored, *(DailySeries.from_daily(out["payload"].get("daily")) for out in fetched)])
+    return {**stored_payload, "resolved": g, "daily": series.slice(s, e).to_daily()}
+
+def plan_update(rec: QueryRecord, body: RecordUpdate) -> tuple[dict, dict, dict]:
+    """(old fields, fields after the update, changes to apply); 400 if the new range is inverted."""
+    old = {k: getattr(rec, k) for k in ("input_location", "resolved_name", "lat", "lon", "start_date", "end_date")}
+    changes = {k: v for k, v in body.model_dump(exclude={"refetch", "id"}).items() if v is not None}
+    if "input_location" in changes:
+        changes["input_location"] = changes["input_location"].strip()
+    merged = {"kind": rec.kind, **old, **changes}
+    if merged["start_date"] and merged["end_date"] and merged["end_date"] < merged["start_date"]:
+        raise HTTPException(400, "end_date must be on/after start_date")
+    return old, merged, changes
+
+async def refetch_changes(old: dict, merged: dict, changes: dict, stored_payload: dict | None,
+                          refetch: bool) -> dict:
+    """`changes` plus a refreshed result_payload for range records, fetching only what the change requires."""
+    if refetch and merged["kind"] == "range" and merged["start_date"] and merged["end_date"]:
+        payload = await derive_payload(old, merged, stored_payload)
+        if payload is not None:
+            resolved = payload.get("resolved", {})
+            changes = {**changes, "resolved_name": resolved.get("name"), "lat": resolved.get("lat"),
+                       "lon": resolved.get("lon"), "result_payload": payload}
+    return changes
 
 @router.patch("/{record_id}", response_model=RecordOut)
-def api_update_record(record_id: int, body: RecordUpdate, db: Session = Depends(get_db)):
-    rec = get_record(db, record_id)
+async def api_update_record(record_id: int, body: RecordUpdate, db: AsyncSession = Depends(get_async_db)):
+    rec = await get_record_async(db, record_id, with_payload=True)
     if not rec:
         raise HTTPException(404, "Record not found")
+    old, merged, changes = plan_update(rec, body)
+    stored_payload = rec.result_payload
+    # end the read transaction: no connection is held while upstream is fetched
+    await db.rollback()
+    changes = await refetch_changes(old, merged, changes, stored_payload, body.refetch)
 
-    # apply updates
-    if body.input_location is not None:
-        rec.input_location = body.input_location.strip()
-    if body.resolved_name is not None:
-        rec.resolved_name = body.resolved_name
-    if body.kind is not None:
-        rec.kind = body.kind
-    if body.start_date is not None:
-        rec.start_date = body.start_date
-    if body.end_date is not None:
-        rec.end_date = body.end_date
-        if rec.start_date and rec.end_date and rec.end_date < rec.start_date:
-            raise HTTPException(400, "end_date must be on/after start_date")
-
-    # re-fetch using the range endpoint if kind==range
-    if body.refetch and rec.kind == "range" and rec.start_date and rec.end_date:
-        rr = RangeRequest(input_location=rec.input_location, start_date=rec.start_date, end_date=rec.end_date)
-        payload = range_weather(rr)["payload"]
-        resolved = payload.get("resolved", {})
-        rec.resolved_name = resolved.get("name")
-        rec.lat = resolved.get("lat")
-        rec.lon = resolved.get("lon")
-        rec.result_payload = payload
-
-    db.add(rec)
-    db.commit()
-    db.refresh(rec)
+    rec = await get_record_async(db, record_id)
+    if not rec:
+        raise HTTPException(404, "Record not found")
+    for k, v in changes.items():
+        setattr(rec, k, v)
+    await db.commit()
+    await db.refresh(rec)
     return rec
 
 @router.delete("/{record_id}")
-def api_delete_record(record_id: int, db: Session = Depends(get_db)):
-    rec = get_record(db, record_id)
+async def api_delete_record(record_id: int, db: AsyncSession = Depends(get_async_db)):
+    rec = await get_record_async(db, record_id)
     if not rec:
         raise HTTPException(404, "Record not found")
-    delete_record(db, rec)
+    await delete_record_async(db, rec)
     return {"ok": True}
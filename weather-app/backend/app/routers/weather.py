@@ -1,91 +1,245 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from datetime import date, timedelta
-import requests
+import asyncio, json, logging, time
+import httpx
+from pydantic import ValidationError
 
-from ..schemas import RangeRequest, GeoOut, WeatherPayload
-from ..weather_utils import geocode as base_geocode, get_current_weather, get_daily_forecast, ip_geolocate
+from ..config import settings
+from .. import payload_tokens
 
+from ..schemas import RangeRequest, GeoOut, PlaceOut, WeatherPayload, StatsOut
+from ..weather_utils import (
+    DAILY_ARCHIVE_VARS, geocode as base_geocode, get_current_weather, get_daily_forecast, ip_geolocate,
+)
+from ..geocode_cache import geocode_cache, normalize_query
+from ..http_client import upstream_flights
+from ..daily_store import fetch_days, retryable
+from ..spatial import spatial_index
+from ..gazetteer import gazetteer
+from ..timeseries import DailySeries, GROUPINGS
+from ..cache import LRUCache
+
+log = logging.getLogger(__name__)
 router = APIRouter(prefix="/weather", tags=["weather"])
 
+# current/forecast responses per grid cell (see spatial.py)
+current_cache = LRUCache(maxsize=4096, ttl=settings.CURRENT_CACHE_TTL)
+forecast_cache = LRUCache(maxsize=4096, ttl=settings.FORECAST_STORE_TTL)
+
 # expose tech1 endpoints too (so frontend can point here)
 @router.get("/geocode", response_model=GeoOut)
-def geocode(q: str):
-    g = base_geocode(q)
+async def geocode(q: str):
+    g = await base_geocode(q)
     if not g:
         raise HTTPException(404, "Location not found")
     return g
 
-@router.get("/current", response_model=WeatherPayload)
-def current(lat: float, lon: float):
-    return {"payload": get_current_weather(lat, lon)}
+@router.get("/autocomplete", response_model=list[PlaceOut])
+async def autocomplete(q: str, limit: int = Query(10, ge=1, le=50)):
+    """Place-name prefix search over the local gazetteer, most populous first."""
+    if not gazetteer.loaded:
+        raise HTTPException(503, "Gazetteer not loaded (set GAZETTEER_PATH)")
+    return gazetteer.autocomplete(q, limit)
 
-@router.get("/forecast", response_model=WeatherPayload)
-def forecast(lat: float, lon: float, days: int = 5):
-    return {"payload": get_daily_forecast(lat, lon, days=days)}
+@router.get("/current", response_model=WeatherPayload, response_model_exclude_none=True)
+async def current(lat: float, lon: float):
+    key, lat, lon = spatial_index.snap(lat, lon)
+    payload = current_cache.get(key)
+    if payload is None:
+        payload = await get_current_weather(lat, lon)
+        current_cache.set(key, payload)
+    return {"payload": payload}
+
+@router.get("/forecast", response_model=WeatherPayload, response_model_exclude_none=True)
+async def forecast(lat: float, lon: float, days: int = 5):
+    key, lat, lon = spatial_index.snap(lat, lon)
+    payload = forecast_cache.get(key)
+    if payload is None:
+        payload = await get_daily_forecast(lat, lon, days=days)
+        forecast_cache.set(key, payload)
+    return {"payload": payload}
 
 @router.get("/ip", response_model=GeoOut)
-def geo_ip():
-    g = ip_geolocate()
+async def geo_ip():
+    g = await ip_geolocate()
     if not g:
         raise HTTPException(404, "IP geolocation failed")
     return g
 
+@router.get("/cache-stats")
+def cache_stats():
+    return {
+        "geocode": geocode_cache.stats(),
+        "singleflight": upstream_flights.stats(),
+        "stats": stats_cache.stats(),
+        "current": current_cache.stats(),
+        "forecast": forecast_cache.stats(),
+        "spatial": spatial_index.stats(),
+    }
+
 # --- HYBRID range: past -> archive, today/future -> forecast, crossing -> split & merge ---
+async def _timed_leg(lat: float, lon: float, s: date, e: date, source: str, allow_partial: bool):
+    """Runs one leg; returns (days | None on tolerated failure, elapsed ms, the tolerated error)."""
+    t0 = time.perf_counter()
+    days, error = None, None
+    try:
+        if not allow_partial:
+            days = await fetch_days(lat, lon, s, e, source)
+        else:
+            days = await asyncio.wait_for(fetch_days(lat, lon, s, e, source), settings.RANGE_LEG_TIMEOUT)
+    except (asyncio.TimeoutError, httpx.HTTPError) as exc:
+        if not allow_partial:
+            raise
+        error = exc
+    return days, round((time.perf_counter() - t0) * 1000, 1), error
+
+
+def _all_legs_failed(errors: list[Exception]) -> Exception:
+    """What to raise when no leg of a partial range came back."""
+    for exc in errors:
+        if not isinstance(exc, asyncio.TimeoutError) and not retryable(exc):
+            return exc  # e.g. a 400 for dates the upstream rejects: not an outage
+    if all(isinstance(exc, (asyncio.TimeoutError, httpx.TimeoutException)) for exc in errors):
+        return HTTPException(504, "Upstream weather service timed out")
+    return HTTPException(502, "Upstream weather service error")
+
+
+async def fetch_range(g: dict, s: date, e: date, allow_partial: bool = False) -> dict:
+    """
+    Daily series for [s, e] at resolved location `g`, as the /weather/range response body.
+    The archive and forecast legs of a range crossing today run concurrently.
+    """
+    if e < s:
+        raise HTTPException(400, "end_date must be on/after start_date")
+
+    today_utc = date.today()
+    legs = []
+    if s < today_utc:
+        legs.append(("archive", s, min(e, today_utc - timedelta(days=1))))
+    if e >= today_utc:
+        legs.append(("forecast", max(s, today_utc), e))
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(
+        _timed_leg(g["lat"], g["lon"], ls, le, source, allow_partial) for source, ls, le in legs
+    ))
+    timing = {f"{source}_ms": ms for (source, _, _), (_, ms, _) in zip(legs, results)}
+    timing["total_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+    parts, missing = [], []
+    for (source, _, _), (leg_days, _, _) in zip(legs, results):
+        if leg_days is None:
+            missing.append(source)
+        else:
+            parts.append(leg_days)
+    if len(missing) == len(legs):
+        raise _all_legs_failed([error for _, _, error in results])
+
+    daily = DailySeries.concat(parts).slice(s, e).to_daily()
+    out = {"payload": {"resolved": g, "daily": daily}, "timing": timing}
+    if allow_partial:
+        out["missing_legs"] = missing
+    return out
+
+
 @router.post("/range", response_model=WeatherPayload)
-def range_weather(body: RangeRequest):
-    g = base_geocode(body.input_location)
+async def range_weather(body: RangeRequest):
+    g = await base_geocode(body.input_location)
     if not g:
         raise HTTPException(404, "Location not found")
+    out = await fetch_range(g, body.start_date, body.end_date, allow_partial=body.allow_partial)
+    if not out.get("missing_legs"):
+        # lets POST /records save this exact payload without fetching it again
+        out["token"] = payload_tokens.issue(out["payload"], body.input_location, body.start_date, body.end_date)
+    return out
 
-    def _archive(lat, lon, s, e):
-        url = "https://archive-api.open-meteo.com/v1/archive"
-        params = {
-            "latitude": lat, "longitude": lon,
-            "start_date": s.isoformat(), "end_date": e.isoformat(),
-            "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum",
-            "timezone": "auto",
-        }
-        r = requests.get(url, params=params, timeout=20)
-        r.raise_for_status()
-        return r.json()
-
-    def _forecast(lat, lon, s, e):
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": lat, "longitude": lon,
-            "start_date": s.isoformat(), "end_date": e.isoformat(),
-            "daily": "weathercode,temperature_2m_max,temperature_2m_min,precipitation_sum,windspeed_10m_max",
-            "timezone": "auto",
-        }
-        r = requests.get(url, params=params, timeout=20)
-        r.raise_for_status()
-        return r.json()
-
-    def _merge_daily(d1: dict, d2: dict) -> dict:
-        out, keys = {}, set()
-        if d1: keys |= set(d1.keys())
-        if d2: keys |= set(d2.keys())
-        for k in keys:
-            a = d1.get(k, []) if d1 else []
-            b = d2.get(k, []) if d2 else []
-            out[k] = a + b if k != "time" else a + [t for t in b if t not in a]
-        return out
-
-    s, e = body.start_date, body.end_date
-    today_utc = date.today()
 
-    if e < s:
-        raise HTTPException(400, "end_date must be on/after start_date")
+# --- Climatology: aggregates over the archive series, computed server-side ---
+stats_cache = LRUCache(maxsize=settings.STATS_CACHE_SIZE, ttl=settings.STATS_CACHE_TTL)
+
+@router.get("/stats", response_model=StatsOut)
+async def weather_stats(location: str, start_date: date, end_date: date,
+                        variables: str = DAILY_ARCHIVE_VARS, group: str = "month"):
+    """
+    Per-group count/mean/min/max/p10/p50/p90/anomaly of daily archive values.
+    group: month | year | doy. Past days only; end_date is clamped to yesterday.
+    """
+    if group not in GROUPINGS:
+        raise HTTPException(400, f"group must be one of: {', '.join(GROUPINGS)}")
+    end_date = min(end_date, date.today() - timedelta(days=1))
+    if end_date < start_date:
+        raise HTTPException(400, "stats need a past range with end_date on/after start_date")
+    wanted = tuple(dict.fromkeys(v.strip() for v in variables.split(",") if v.strip()))
+
+    g = await base_geocode(location)
+    if not g:
+        raise HTTPException(404, "Location not found")
+    key = (spatial_index.snap(g["lat"], g["lon"])[0], start_date, end_date, group, wanted)
+    cached = stats_cache.get(key)
+    if cached is not None:
+        return {**cached, "resolved": g}
+
+    series = (await fetch_days(g["lat"], g["lon"], start_date, end_date, "archive")).slice(start_date, end_date)
+    groups, stats = series.group_stats(group, wanted)
+    out = {"resolved": g, "group": group, "start_date": start_date, "end_date": end_date,
+           "groups": groups, "stats": stats}
+    stats_cache.set(key, out)
+    return out
+
+
+# --- Batch: many ranges in one call, streamed back as NDJSON in completion order ---
+@router.post("/range/batch")
+async def range_weather_batch(raw_items: list[dict] = Body(...)):
+    """
+    RangeRequest bodies (at most BULK_MAX_ITEMS). Each item is validated on its own:
+    an invalid one (e.g. end_date before start_date) becomes an error line, not a 422.
+    """
+    if len(raw_items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(400, f"At most {settings.BULK_MAX_ITEMS} items per batch request")
+    # identical (location, range) items are fetched once and reported with all their indices
+    items: dict[int, RangeRequest] = {}
+    invalid: list[dict] = []
+    groups: dict[tuple, list[int]] = {}
+    for i, raw in enumerate(raw_items):
+        try:
+            item = items[i] = RangeRequest.model_validate(raw)
+        except ValidationError as exc:
+            invalid.append({"indices": [i], **raw, "ok": False, "status": 400,
+                            "error": "; ".join(e["msg"] for e in exc.errors())})
+            continue
+        key = (normalize_query(item.input_location), item.start_date, item.end_date, item.allow_partial)
+        groups.setdefault(key, []).append(i)
+
+    sem = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def _one(indices: list[int]) -> dict:
+        item = items[indices[0]]
+        head = {"indices": indices, **item.model_dump(mode="json")}
+        try:
+            async with sem:
+                g = await base_geocode(item.input_location)
+                if not g:
+                    raise HTTPException(404, "Location not found")
+                return {**head, "ok": True, **await fetch_range(g, item.start_date, item.end_date, item.allow_partial)}
+        except HTTPException as exc:
+            return {**head, "ok": False, "status": exc.status_code, "error": exc.detail}
+        except httpx.HTTPError as exc:
+            return {**head, "ok": False, "status": 502, "error": f"Upstream error: {exc}"}
+        except Exception:
+            # bad upstream JSON, a DB error while storing days, ...: report it, keep streaming the rest
+            log.exception("batch item %s failed", indices)
+            return {**head, "ok": False, "status": 500, "error": "Internal error"}
+
+    async def _stream():
+        for line in invalid:
+            yield json.dumps(line) + "\n"
+        tasks = [asyncio.create_task(_one(indices)) for indices in groups.values()]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield json.dumps(await done) + "\n"
+        finally:
+            for t in tasks:
+                t.cancel()
 
-    if e < today_utc:
-        payload = _archive(g["lat"], g["lon"], s, e)
-    elif s >= today_utc:
-        payload = _forecast(g["lat"], g["lon"], s, e)
-    else:
-        past_end = today_utc - timedelta(days=1)
-        past = _archive(g["lat"], g["lon"], s, past_end)
-        future = _forecast(g["lat"], g["lon"], today_utc, e)
-        merged = _merge_daily(past.get("daily", {}), future.get("daily", {}))
-        payload = {"daily": merged}
-
-    return {"payload": {"resolved": g, **payload}}
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
@@ -6,6 +6,7 @@ class RangeRequest(BaseModel):
     input_location: str
     start_date: date
     end_date: date
+    allow_partial: bool = False  # return what arrived if one leg times out (see missing_legs)
 
     @field_validator("end_date")
     @classmethod
@@ -25,8 +26,34 @@ class GeoOut(BaseModel):
     lat: float
     lon: float
 
+class PlaceOut(GeoOut):
+    country_code: str
+    population: int
+
 class WeatherPayload(BaseModel):
     payload: dict
+    timing: dict[str, float] | None = None  # per-leg upstream/store time for /weather/range
+    missing_legs: list[str] | None = None   # legs dropped when allow_partial=True
+    token: str | None = None                # signed, short-lived; pass back as RecordCreate.payload_token
+
+class VariableStats(BaseModel):
+    """One variable's per-group stats, each list aligned with StatsOut.groups; None where a group has no values."""
+    count: list[int]
+    mean: list[float | None]
+    min: list[float | None]
+    max: list[float | None]
+    p10: list[float | None]
+    p50: list[float | None]
+    p90: list[float | None]
+    anomaly: list[float | None]  # group mean minus the mean over the whole range
+
+class StatsOut(BaseModel):
+    resolved: GeoOut
+    group: str            # 'month' | 'year' | 'doy'
+    start_date: date
+    end_date: date
+    groups: list[int]     # group keys, aligned with every list in `stats`
+    stats: dict[str, VariableStats]
 
 # --- Records ---
 class RecordCreate(BaseModel):
@@ -38,6 +65,7 @@ class RecordCreate(BaseModel):
     lat: float | None = None
     lon: float | None = None
     result_payload: dict | None = None
+    payload_token: str | None = None  # from /weather/range; if valid, result_payload is stored as-is
 
 class RecordOut(BaseModel):
     id: int
@@ -60,3 +88,37 @@ class RecordUpdate(BaseModel):
     start_date: date | None = None
     end_date: date | None = None
     refetch: bool = True  # if true, refresh result_payload based on updates
+
+class RecordBulkUpdate(RecordUpdate):
+    id: int
+
+class BulkItemResult(BaseModel):
+    index: int                 # position in the request body
+    ok: bool
+    id: int | None = None
+    status: int | None = None  # HTTP-style status of a failed item
+    error: str | None = None
+
+class BulkResult(BaseModel):
+    ok: int
+    failed: int
+    results: list[BulkItemResult]
+
+class BulkDeleteOut(BaseModel):
+    deleted: int
+    ids: list[int]
+    missing: list[int] = []    # requested ids that did not exist
+
+# --- Background jobs ---
+class JobOut(BaseModel):
+    id: str
+    kind: str                  # 'range' | 'record'
+    status: str                # 'queued' | 'running' | 'done' | 'failed'
+    progress: float            # 0..1
+    message: str | None = None
+    error: str | None = None
+    attempts: int
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    result: dict | None = None  # /weather/range body or the created RecordOut, once done
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _LeaderCancelled(Exception):
+    """Set on the shared future when the leader is cancelled; its followers retry on their own."""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs `fn`,
+    every duplicate that arrives while it is in flight gets the same result
+    (or exception). Nothing is cached once the call completes.
+    A cancelled leader (timeout, client disconnect) does not cancel its
+    followers: they run the call again, one of them as the new leader.
+    """
+
+    def __init__(self):
+        self._async: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0      # calls that actually ran fn
+        self.coalesced = 0  # duplicate calls that were saved
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        fut = self._async.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(fut)
+            except _LeaderCancelled:
+                return await self.do(key, fn)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._async[key] = fut
+        self.calls += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            fut.set_exception(_LeaderCancelled())
+            fut.exception()
+            raise
+        except BaseException as exc:
+            fut.set_exception(exc)
+            fut.exception()  # mark retrieved: no waiters is not an error
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            self._async.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+
+def request_key(url: str, params: dict | None) -> tuple:
+    """Normalized upstream request identity: URL plus params sorted, values as strings."""
+    items = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    return (url, items)
@@ -0,0 +1,130 @@
+import math
+import threading
+
+from sqlalchemy import select
+
+from .config import settings
+from .db import SessionLocal
+from .models import DailyObservation
+
+# Weather caches are keyed on a grid cell, not on raw coordinates, so
+# "Austin, TX" and "30.2672,-97.7431" share cached data. Cells are either a
+# fixed-degree grid (SPATIAL_GRID_DEG, ~Open-Meteo's model resolution) or
+# geohash cells of GEOHASH_PRECISION characters.
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat: float, lon: float, precision: int) -> str:
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    out, bits, ch, even = [], 0, 0, True
+    while len(out) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            ch = ch * 2 + (lon >= mid)
+            lon_lo, lon_hi = (mid, lon_hi) if lon >= mid else (lon_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            ch = ch * 2 + (lat >= mid)
+            lat_lo, lat_hi = (mid, lat_hi) if lat >= mid else (lat_lo, mid)
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(out)
+
+
+def cell_size() -> tuple[float, float]:
+    """(lat, lon) size of one grid cell in degrees."""
+    if settings.SPATIAL_GRID == "geohash":
+        total = 5 * settings.GEOHASH_PRECISION
+        return 180.0 / 2 ** (total // 2), 360.0 / 2 ** (total - total // 2)
+    return settings.SPATIAL_GRID_DEG, settings.SPATIAL_GRID_DEG
+
+
+def cell_key(lat: float, lon: float) -> str:
+    if settings.SPATIAL_GRID == "geohash":
+        return "g:" + geohash(lat, lon, settings.GEOHASH_PRECISION)
+    res = settings.SPATIAL_GRID_DEG
+    return f"d{res}:{math.floor(lat / res)}:{math.floor(lon / res)}"
+
+
+def neighbour_keys(lat: float, lon: float) -> list[str]:
+    """The 8 cells around the one containing (lat, lon)."""
+    dlat, dlon = cell_size()
+    keys = []
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            if i or j:
+                nlat = max(-90.0, min(90.0, lat + i * dlat))
+                nlon = (lon + j * dlon + 180.0) % 360.0 - 180.0
+                keys.append(cell_key(nlat, nlon))
+    return keys
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+class SpatialIndex:
+    """
+    Grid-bucketed index of representative points, one per cell with rows in the
+    daily store. snap() maps any coordinate to (cache key, lat, lon) to fetch/cache with:
+      - the representative of its own cell, if the cell has one;
+      - else the nearest representative in a neighbouring cell within SPATIAL_REUSE_KM;
+      - else the point itself (save_days registers it once it stores days there).
+    """
+
+    def __init__(self):
+        self._reps: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._warmed = False
+        self.snapped = 0  # requests served by an existing representative
+
+    def warm(self) -> None:
+        """Loads the representatives already used by the daily store (survives restarts)."""
+        stmt = select(DailyObservation.loc_key, DailyObservation.lat, DailyObservation.lon).distinct()
+        with SessionLocal() as db:
+            rows = db.execute(stmt).all()
+        with self._lock:
+            for key, lat, lon in rows:
+                if key == cell_key(lat, lon):  # skip rows keyed for another grid setting
+                    self._reps.setdefault(key, (lat, lon))
+            self._warmed = True
+
+    def snap(self, lat: float, lon: float) -> tuple[str, float, float]:
+        if not self._warmed:
+            self.warm()
+        key = cell_key(lat, lon)
+        with self._lock:
+            rep = self._reps.get(key)
+            if rep is not None:
+                self.snapped += 1
+                return key, rep[0], rep[1]
+            best = None
+            for nkey in neighbour_keys(lat, lon):
+                nrep = self._reps.get(nkey)
+                if nrep is None:
+                    continue
+                d = haversine_km(lat, lon, *nrep)
+                if d <= settings.SPATIAL_REUSE_KM and (best is None or d < best[0]):
+                    best = (d, nkey, nrep)
+            if best is not None:
+                self.snapped += 1
+                return best[1], best[2][0], best[2][1]
+            return key, lat, lon
+
+    def register(self, key: str, lat: float, lon: float) -> None:
+        """Makes (lat, lon) the representative of cell `key` unless it already has one."""
+        with self._lock:
+            self._reps.setdefault(key, (lat, lon))
+
+    def stats(self) -> dict:
+        return {"cells": len(self._reps), "snapped": self.snapped}
+
+
+spatial_index = SpatialIndex()
@@ -0,0 +1,214 @@
+from datetime import date
+from typing import Iterable, Iterator
+
+import numpy as np
+
+# Variables Open-Meteo reports as integers (WMO codes); kept as ints on the way out.
+INTEGER_VARIABLES = {"weathercode"}
+
+DAY = np.timedelta64(1, "D")
+
+GROUPINGS = ("month", "year", "doy")
+
+
+class DailySeries:
+    """
+    Columnar daily time series: a sorted, unique datetime64[D] index plus one
+    float64 array per variable (NaN = missing). Merging/slicing/concatenating
+    align on the date index instead of list positions, so legs with different
+    variable sets (archive has no weathercode/windspeed) stay aligned.
+    """
+
+    __slots__ = ("dates", "columns")
+
+    def __init__(self, dates: np.ndarray, columns: dict[str, np.ndarray]):
+        self.dates = dates
+        self.columns = columns
+
+    # ---------- construction ----------
+    @classmethod
+    def empty(cls) -> "DailySeries":
+        return cls(np.array([], dtype="datetime64[D]"), {})
+
+    @classmethod
+    def from_daily(cls, daily: dict | None) -> "DailySeries":
+        """From an Open-Meteo style `daily` block: {'time': [...], var: [...]}."""
+        if not daily or not daily.get("time"):
+            return cls.empty()
+        dates = np.array(daily["time"], dtype="datetime64[D]")
+        n = len(dates)
+        columns = {}
+        for k, values in daily.items():
+            if k == "time" or not isinstance(values, list):
+                continue
+            arr = np.full(n, np.nan)
+            m = min(n, len(values))
+            arr[:m] = np.array(values[:m], dtype=float)  # None -> nan
+            columns[k] = arr
+        if n > 1 and not np.all(dates[1:] > dates[:-1]):
+            # unsorted or duplicated days: keep the last value seen for each day
+            order = np.argsort(dates, kind="stable")
+            dates = dates[order]
+            keep = np.append(dates[1:] != dates[:-1], True)
+            dates = dates[keep]
+            columns = {k: v[order][keep] for k, v in columns.items()}
+        return cls(dates, columns)
+
+    @classmethod
+    def from_days(cls, days: dict[date, dict]) -> "DailySeries":
+        """From {day: {var: value}} (e.g. rows of the daily_observations table)."""
+        if not days:
+            return cls.empty()
+        ordered = sorted(days)
+        variables: dict[str, None] = {}
+        for d in ordered:
+            variables.update(dict.fromkeys(days[d]))
+        daily = {"time": [d.isoformat() for d in ordered]}
+        for v in variables:
+            daily[v] = [days[d].get(v) for d in ordered]
+        return cls.from_daily(daily)
+
+    @classmethod
+    def concat(cls, parts: Iterable["DailySeries"]) -> "DailySeries":
+        """
+        Union of all parts on the date index. Where parts overlap, the later
+        part wins for every variable it actually has a (non-NaN) value for.
+        """
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        dates = np.unique(np.concatenate([p.dates for p in parts]))
+        variables = list(dict.fromkeys(k for p in parts for k in p.columns))
+        columns = {k: np.full(len(dates), np.nan) for k in variables}
+        for p in parts:
+            idx = np.searchsorted(dates, p.dates)
+            for k, v in p.columns.items():
+                col = columns[k]
+                col[idx] = np.where(np.isnan(v), col[idx], v)
+        return cls(dates, columns)
+
+    # ---------- operations ----------
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def merge(self, other: "DailySeries") -> "DailySeries":
+        return DailySeries.concat([self, other])
+
+    def slice(self, s: date, e: date) -> "DailySeries":
+        """Days within [s, e] (inclusive)."""
+        lo = np.searchsorted(self.dates, np.datetime64(s, "D"), side="left")
+        hi = np.searchsorted(self.dates, np.datetime64(e, "D"), side="right")
+        return DailySeries(self.dates[lo:hi], {k: v[lo:hi] for k, v in self.columns.items()})
+
+    def select(self, variables: Iterable[str]) -> "DailySeries":
+        return DailySeries(self.dates, {k: self.columns[k] for k in variables if k in self.columns})
+
+    def non_empty(self) -> "DailySeries":
+        """Drops days where every variable is NaN (e.g. archive days not yet published)."""
+        if not self.columns:
+            return DailySeries.empty()
+        mask = ~np.all(np.isnan(np.vstack(list(self.columns.values()))), axis=0)
+        return DailySeries(self.dates[mask], {k: v[mask] for k, v in self.columns.items()})
+
+    def missing_ranges(self, s: date, e: date) -> list[tuple[date, date]]:
+        """Contiguous sub-ranges of [s, e] with no day in the index."""
+        full = np.arange(np.datetime64(s, "D"), np.datetime64(e, "D") + DAY, dtype="datetime64[D]")
+        missing = full[~np.isin(full, self.dates)]
+        if not len(missing):
+            return []
+        breaks = np.nonzero(np.diff(missing) != DAY)[0]
+        starts = np.concatenate([missing[:1], missing[breaks + 1]])
+        ends = np.concatenate([missing[breaks], missing[-1:]])
+        return [(a.item(), b.item()) for a, b in zip(starts, ends)]
+
+    def group_keys(self, group: str) -> np.ndarray:
+        """Per-day group key: month 1-12, calendar year, or day-of-year 1-366."""
+        if group == "month":
+            return self.dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+        if group == "year":
+            return self.dates.astype("datetime64[Y]").astype(np.int64) + 1970
+        if group == "doy":
+            return (self.dates - self.dates.astype("datetime64[Y]")).astype(np.int64) + 1
+        raise ValueError(f"group must be one of {GROUPINGS}")
+
+    def group_stats(self, group: str, variables: Iterable[str],
+                    percentiles: tuple[int, ...] = (10, 50, 90)) -> tuple[list[int], dict[str, dict[str, list]]]:
+        """
+        (group keys, {var: {count, mean, min, max, p.., anomaly}}) with NaNs ignored.
+        `anomaly` is the group mean minus the mean over the whole series.
+        """
+        groups, inv = np.unique(self.group_keys(group), return_inverse=True)
+        G = len(groups)
+        out: dict[str, dict[str, list]] = {}
+        for k in variables:
+            if k not in self.columns:
+                continue
+            v = self.columns[k]
+            valid = ~np.isnan(v)
+            gi, gv = inv[valid], v[valid]
+            count = np.bincount(gi, minlength=G)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.bincount(gi, weights=gv, minlength=G) / count
+            vmin = np.full(G, np.inf)
+            vmax = np.full(G, -np.inf)
+            np.minimum.at(vmin, gi, gv)
+            np.maximum.at(vmax, gi, gv)
+            empty = count == 0
+            vmin[empty] = vmax[empty] = np.nan
+
+            # percentiles: sort values within groups once, then interpolate per group
+            order = np.lexsort((gv, gi))
+            sv = gv[order]
+            offsets = np.concatenate([[0], np.cumsum(count)[:-1]])
+            stats = {"count": count.tolist()}
+            cols = {"mean": mean, "min": vmin, "max": vmax}
+            for p in percentiles:
+                pos = np.maximum(count - 1, 0) * (p / 100.0)
+                lo, hi = np.floor(pos).astype(np.int64), np.ceil(pos).astype(np.int64)
+                safe = ~empty
+                res = np.full(G, np.nan)
+                a, b = sv[(offsets + lo)[safe]], sv[(offsets + hi)[safe]]
+                res[safe] = a + (b - a) * (pos - lo)[safe]
+                cols[f"p{p}"] = res
+            overall = gv.mean() if len(gv) else np.nan
+            cols["anomaly"] = mean - overall
+            for name, arr in cols.items():
+                rounded = np.round(arr, 3).astype(object)
+                rounded[np.isnan(arr)] = None
+                stats[name] = rounded.tolist()
+            out[k] = stats
+        return groups.tolist(), out
+
+    # ---------- output ----------
+    def _values(self, k: str) -> list:
+        v = self.columns[k]
+        nan = np.isnan(v)
+        if k in INTEGER_VARIABLES:
+            out = np.where(nan, 0, v).astype(np.int64).astype(object)
+        else:
+            out = v.astype(object)
+        out[nan] = None
+        return out.tolist()
+
+    def to_daily(self) -> dict:
+        """Back to a JSON-ready `daily` block (NaN -> None)."""
+        out = {"time": np.datetime_as_string(self.dates, unit="D").tolist()}
+        for k in self.columns:
+            out[k] = self._values(k)
+        return out
+
+    def to_days(self) -> dict[date, dict]:
+        """{day: {var: value}} for storage, one dict per day."""
+        variables = list(self.columns)
+        values = [self._values(k) for k in variables]
+        days = [d.item() for d in self.dates]
+        return {d: {k: values[j][i] for j, k in enumerate(variables)} for i, d in enumerate(days)}
+
+    def iter_rows(self, variables: list[str]) -> Iterator[tuple[str, list]]:
+        """(iso day, [value per variable]) with None for missing/absent variables."""
+        cols = [self._values(k) if k in self.columns else [None] * len(self) for k in variables]
+        days = np.datetime_as_string(self.dates, unit="D").tolist()
+        for i, d in enumerate(days):
+            yield d, [c[i] for c in cols]
@@ -1,8 +1,17 @@
-import requests
+import asyncio
+from datetime import date
 from typing import Optional
 
+from .config import settings
+from .gazetteer import gazetteer
+from .geocode_cache import geocode_cache, normalize_query, MISS
+from .http_client import get_json
+
+DAILY_ARCHIVE_VARS = "temperature_2m_max,temperature_2m_min,precipitation_sum"
+DAILY_FORECAST_VARS = "weathercode,temperature_2m_max,temperature_2m_min,precipitation_sum,windspeed_10m_max"
+
 # ---------- Geocoding ----------
-def geocode(query: str) -> Optional[dict]:
+async def geocode(query: str) -> Optional[dict]:
     """
     Returns {'name': str, 'lat': float, 'lon': float} or None.
     Accepts GPS input like 'lat,lon' directly.
@@ -21,12 +30,27 @@ def geocode(query: str) -> Optional[dict]:
             except ValueError:
                 pass  # fall through to API
 
+    # local gazetteer first: common city names resolve without any upstream call
+    local = gazetteer.lookup(q)
+    if local is not None:
+        return local
+
+    key = normalize_query(q)
+    cached = geocode_cache.get_memory(key)  # hot path: no thread hop for memory hits
+    if cached is MISS:
+        cached = await asyncio.to_thread(geocode_cache.get_disk, key)
+    if cached is not MISS:
+        return cached
+    result = await _geocode_remote(q)
+    await asyncio.to_thread(geocode_cache.set, key, result)
+    return result
+
+
+async def _geocode_remote(q: str) -> Optional[dict]:
     # Open-Meteo geocoding (free)
-    url = "https://geocoding-api.open-meteo.com/v1/search"
+    url = settings.GEOCODE_URL
     params = {"name": q, "count": 1, "language": "en", "format": "json"}
-    r = requests.get(url, params=params, timeout=15)
-    r.raise_for_status()
-    data = r.json()
+    data = await get_json(url, params=params, site="geocode")
     if not data.get("results"):
         return None
     top = data["results"][0]
@@ -35,38 +59,56 @@ def geocode(query: str) -> Optional[dict]:
 
 
 # ---------- Weather ----------
-def get_current_weather(lat: float, lon: float) -> dict:
-    url = "https://api.open-meteo.com/v1/forecast"
+async def get_current_weather(lat: float, lon: float) -> dict:
+    url = settings.FORECAST_URL
     params = {"latitude": lat, "longitude": lon, "current_weather": True}
-    r = requests.get(url, params=params, timeout=15)
-    r.raise_for_status()
-    return r.json()
+    return await get_json(url, params=params, site="current")
 
-def get_daily_forecast(lat: float, lon: float, days: int = 5) -> dict:
+async def get_daily_forecast(lat: float, lon: float, days: int = 5) -> dict:
     """
     Returns a daily forecast block. Open-Meteo returns many days; the client can truncate to 5.
     """
-    url = "https://api.open-meteo.com/v1/forecast"
+    url = settings.FORECAST_URL
     params = {
         "latitude": lat,
         "longitude": lon,
-        "daily": "weathercode,temperature_2m_max,temperature_2m_min,precipitation_sum,windspeed_10m_max",
+        "daily": DAILY_FORECAST_VARS,
+        "timezone": "auto",
+    }
+    return await get_json(url, params=params, site="forecast")
+
+
+# ---------- Date ranges (used by /weather/range) ----------
+async def get_archive_range(lat: float, lon: float, s: date, e: date) -> dict:
+    """Past days from the Open-Meteo archive API."""
+    url = settings.ARCHIVE_URL
+    params = {
+        "latitude": lat, "longitude": lon,
+        "start_date": s.isoformat(), "end_date": e.isoformat(),
+        "daily": DAILY_ARCHIVE_VARS,
+        "timezone": "auto",
+    }
+    return await get_json(url, params=params, timeout=settings.HTTP_RANGE_TIMEOUT, site="archive_range")
+
+async def get_forecast_range(lat: float, lon: float, s: date, e: date) -> dict:
+    """Today/future days from the Open-Meteo forecast API."""
+    url = settings.FORECAST_URL
+    params = {
+        "latitude": lat, "longitude": lon,
+        "start_date": s.isoformat(), "end_date": e.isoformat(),
+        "daily": DAILY_FORECAST_VARS,
         "timezone": "auto",
     }
-    r = requests.get(url, params=params, timeout=15)
-    r.raise_for_status()
-    return r.json()
+    return await get_json(url, params=params, timeout=settings.HTTP_RANGE_TIMEOUT, site="forecast_range")
 
 
 # ---------- IP Geolocation (approx current location) ----------
-def ip_geolocate() -> Optional[dict]:
+async def ip_geolocate() -> Optional[dict]:
     """
     Approximate location by public IP (free). Works well when running locally.
     """
     # ipapi.co is free for simple lookups (no key)
-    r = requests.get("https://ipapi.co/json/", timeout=10)
-    r.raise_for_status()
-    data = r.json()
+    data = await get_json(settings.IPAPI_URL, timeout=10, site="ip_geolocate")
     lat = data.get("latitude"); lon = data.get("longitude")
     city = data.get("city"); country = data.get("country")
     if lat is None or lon is None:
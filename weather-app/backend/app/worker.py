@@ -0,0 +1,39 @@
+"""Standalone job worker for JOB_BACKEND=external.
+
+Usage (from backend/, same DB_URL as the API):
+  python -m app.worker                # JOB_WORKERS concurrent jobs
+  python -m app.worker --workers 8
+
+Runs until SIGINT/SIGTERM; jobs still running then are put back in the queue.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from .config import settings
+from .db import dispose_async_engine, init_db
+from .http_client import close_client
+from .jobs import WORKER_ID, runner
+
+
+async def main(workers: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    init_db()  # same as the API's startup, for a fresh DB
+    runner.start(workers)
+    logging.info("job worker %s running %d jobs at once", WORKER_ID, workers)
+    await stop.wait()
+    await runner.stop()
+    await close_client()
+    await dispose_async_engine()
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Run background jobs from the jobs table")
+    p.add_argument("--workers", type=int, default=settings.JOB_WORKERS)
+    args = p.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main(args.workers))
@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a throwaway database and at an
+# upstream that does not exist before anything under app/ is imported.
+_tmp = tempfile.mkdtemp(prefix="weather-tests-")
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+for _name in ("GEOCODE_URL", "FORECAST_URL", "ARCHIVE_URL", "IPAPI_URL"):
+    os.environ[_name] = "http://127.0.0.1:9/unreachable"
+os.environ["JOB_BACKEND"] = "external"  # no background workers inside TestClient
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _tables():
+    from app.db import init_db
+    init_db()
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def make_record():
+    """Inserts a QueryRecord straight into the DB; every record is removed after the test."""
+    from app.db import SessionLocal
+    from app.models import QueryRecord
+
+    def make(**fields) -> int:
+        values = dict(input_location="Madrid", resolved_name="Madrid, ES", lat=40.4168, lon=-3.7038,
+                      kind="range", result_payload={"resolved": {}, "daily": {"time": []}})
+        values.update(fields)
+        with SessionLocal() as db:
+            rec = QueryRecord(**values)
+            db.add(rec)
+            db.commit()
+            return rec.id
+
+    yield make
+    with SessionLocal() as db:
+        db.query(QueryRecord).delete()
+        db.commit()
@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import delete, select
+
+from app import daily_store
+from app.db import SessionLocal
+from app.models import DailyObservation
+from app.timeseries import DailySeries
+
+KEY = "test:cell"
+
+
+def _series(s: date, n: int, value: float) -> DailySeries:
+    return DailySeries.from_days({s + timedelta(days=i): {"temperature_2m_max": value} for i in range(n)})
+
+
+@pytest.fixture(autouse=True, params=["upsert", "savepoint"])
+def _clean(request, monkeypatch):
+    if request.param == "savepoint":  # the fallback for dialects without ON CONFLICT
+        monkeypatch.setattr(daily_store, "_upsert", lambda dialect: None)
+    yield
+    with SessionLocal() as db:
+        db.execute(delete(DailyObservation).where(DailyObservation.loc_key == KEY))
+        db.commit()
+
+
+def _stored() -> dict:
+    with SessionLocal() as db:
+        rows = db.execute(select(DailyObservation.day, DailyObservation.source, DailyObservation.values)
+                          .where(DailyObservation.loc_key == KEY)).all()
+    return {day: (source, values["temperature_2m_max"]) for day, source, values in rows}
+
+
+def test_overlapping_writes_keep_every_day():
+    s = date(2021, 3, 1)
+    daily_store.save_days(KEY, 1.0, 2.0, _series(s, 5, 1.0), "archive")
+    # a second writer covering days 3..9: the overlap is updated, the new days are not lost
+    daily_store.save_days(KEY, 1.0, 2.0, _series(s + timedelta(days=3), 7, 2.0), "archive")
+    stored = _stored()
+    assert len(stored) == 10
+    assert stored[s] == ("archive", 1.0)
+    assert stored[s + timedelta(days=4)] == ("archive", 2.0)
+
+
+def test_archive_row_replaces_forecast_row():
+    day = date(2021, 3, 1)
+    daily_store.save_days(KEY, 1.0, 2.0, _series(day, 1, 5.0), "forecast")
+    daily_store.save_days(KEY, 1.0, 2.0, _series(day, 1, 6.0), "archive")
+    assert _stored() == {day: ("archive", 6.0)}
+    assert len(daily_store.load_days(KEY, day, day, "archive")) == 1
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from app import jobs
+from app.config import settings
+from app.db import SessionLocal, dispose_async_engine
+from app.models import Job
+
+
+def _job(id, status, **fields) -> Job:
+    return Job(id=id, kind="range", status=status, params={}, attempts=1, **fields)
+
+
+def test_stale_jobs_requeued_while_workers_are_busy(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_SWEEP_INTERVAL", 0.05)
+    monkeypatch.setattr(settings, "JOB_POLL_INTERVAL", 0.05)
+    ran = []
+
+    async def run_job(job):
+        ran.append(job.id)
+        await asyncio.Event().wait()  # keeps the only worker busy
+
+    monkeypatch.setattr(jobs, "run_job", run_job)
+    long_ago = datetime.utcnow() - timedelta(hours=1)
+    with SessionLocal() as db:
+        db.add_all([_job("busy", "queued"), _job("stale", "running", heartbeat_at=long_ago, worker="gone:1")])
+        db.commit()
+
+    async def main():
+        runner = jobs.JobRunner()
+        runner.start(1)
+        await asyncio.sleep(0.3)
+        await runner.stop()
+        await dispose_async_engine()
+
+    try:
+        asyncio.run(main())
+        with SessionLocal() as db:
+            stale = db.execute(select(Job).where(Job.id == "stale")).scalar_one()
+        assert ran == ["busy"]
+        assert (stale.status, stale.worker) == ("queued", None)
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(Job))
+            db.commit()
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+
+from app.config import settings
+from app.db import Base, init_db
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def alembic_db(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    monkeypatch.setattr(settings, "DB_URL", url)  # env.py migrates settings.DB_URL
+    return Config(str(BACKEND / "alembic.ini")), url
+
+
+def test_upgrade_head_on_empty_database_matches_models(alembic_db):
+    cfg, url = alembic_db
+    command.upgrade(cfg, "head")
+    tables = set(inspect(create_engine(url)).get_table_names())
+    assert set(Base.metadata.tables) <= tables
+    command.check(cfg)  # raises if the models and the migrated schema differ
+
+
+def test_downgrade_to_base_and_back(alembic_db):
+    cfg, url = alembic_db
+    command.upgrade(cfg, "head")
+    command.downgrade(cfg, "base")
+    assert inspect(create_engine(url)).get_table_names() == ["alembic_version"]
+    command.upgrade(cfg, "head")
+
+
+def test_init_db_leaves_alembic_managed_databases_alone(alembic_db, monkeypatch):
+    cfg, url = alembic_db
+    command.upgrade(cfg, "1896d5057843")
+    engine = create_engine(url)
+    monkeypatch.setattr("app.db.engine", engine)
+    init_db()
+    assert "jobs" not in inspect(engine).get_table_names()
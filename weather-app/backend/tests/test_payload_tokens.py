@@ -0,0 +1,52 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from app import payload_tokens
+from app.config import settings
+from app.routers import records
+from app.schemas import RecordCreate
+
+S, E = date(2020, 1, 1), date(2020, 1, 3)
+PAYLOAD = {"resolved": {"name": "Lima", "lat": -12.0, "lon": -77.0}, "daily": {"time": ["2020-01-01"]}}
+
+
+def test_token_verifies_same_payload_and_normalized_location():
+    token = payload_tokens.issue(PAYLOAD, "Lima", S, E)
+    assert payload_tokens.verify(token, PAYLOAD, "  lima ", S, E)
+
+
+@pytest.mark.parametrize("payload, loc, s, e", [
+    ({**PAYLOAD, "daily": {"time": ["2020-01-02"]}}, "Lima", S, E),
+    (PAYLOAD, "Quito", S, E),
+    (PAYLOAD, "Lima", S, date(2020, 1, 4)),
+])
+def test_token_rejects_anything_else(payload, loc, s, e):
+    token = payload_tokens.issue(PAYLOAD, "Lima", S, E)
+    assert not payload_tokens.verify(token, payload, loc, s, e)
+
+
+@pytest.mark.parametrize("token", ["", "garbage", "123.abc", None])
+def test_malformed_tokens_rejected(token):
+    assert not payload_tokens.verify(token, PAYLOAD, "Lima", S, E)
+
+
+def test_expired_token_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "PAYLOAD_TOKEN_TTL", -1)
+    assert not payload_tokens.verify(payload_tokens.issue(PAYLOAD, "Lima", S, E), PAYLOAD, "Lima", S, E)
+
+
+def test_create_payload_refetches_without_valid_token(monkeypatch):
+    fetched = {"resolved": {"name": "Lima", "lat": -12.0, "lon": -77.0}, "daily": {}}
+
+    async def range_weather(rr):
+        return {"payload": fetched}
+
+    monkeypatch.setattr(records, "range_weather", range_weather)
+    body = dict(input_location="Lima", start_date=S, end_date=E, result_payload=PAYLOAD)
+    good = RecordCreate(**body, payload_token=payload_tokens.issue(PAYLOAD, "Lima", S, E))
+    forged = RecordCreate(**body, payload_token=payload_tokens.issue(fetched, "Lima", S, E))
+    assert asyncio.run(records.create_payload(good)) is good.result_payload
+    assert asyncio.run(records.create_payload(forged)) is fetched
+    assert asyncio.run(records.create_payload(RecordCreate(**body))) is fetched
@@ -0,0 +1,88 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from app.config import settings
+from app.routers import records
+from app.timeseries import DailySeries
+
+TODAY = date.today()
+
+
+def _daily(s: date, e: date, value: float) -> dict:
+    days = [(s + timedelta(days=i)).isoformat() for i in range((e - s).days + 1)]
+    return {"time": days, "temperature_2m_max": [value] * len(days)}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake geocode + fetch_range; fetched days carry 99.0 so reuse vs refetch is visible."""
+    calls = []
+    places = {"madrid": {"name": "Madrid, ES", "lat": 40.4168, "lon": -3.7038},
+              "puerta del sol": {"name": "Puerta del Sol, ES", "lat": 40.4169, "lon": -3.7035},
+              "oslo": {"name": "Oslo, NO", "lat": 59.91, "lon": 10.75}}
+
+    async def geocode(q):
+        return places.get(q.strip().lower())
+
+    async def fetch_range(g, s, e, allow_partial=False):
+        calls.append((s, e))
+        return {"payload": {"resolved": g, "daily": _daily(s, e, 99.0)}}
+
+    monkeypatch.setattr(records, "base_geocode", geocode)
+    monkeypatch.setattr(records, "fetch_range", fetch_range)
+    return calls
+
+
+def _old(s: date, e: date) -> tuple[dict, dict]:
+    old = {"input_location": "Madrid", "resolved_name": "Madrid, ES", "lat": 40.4168, "lon": -3.7038,
+           "start_date": s, "end_date": e}
+    return old, {"resolved": {"name": "Madrid, ES", "lat": 40.4168, "lon": -3.7038}, "daily": _daily(s, e, 1.0)}
+
+
+def test_move_within_the_same_cell_rewrites_resolved_and_reuses_days(upstream):
+    s, e = date(2020, 1, 1), date(2020, 1, 10)
+    old, stored = _old(s, e)
+    new = {**old, "input_location": "Puerta del Sol"}
+    payload = asyncio.run(records.derive_payload(old, new, stored))
+    assert payload["resolved"]["name"] == "Puerta del Sol, ES"
+    assert payload["daily"]["temperature_2m_max"] == [1.0] * 10
+    assert upstream == []
+
+
+def test_move_to_another_cell_refetches_everything(upstream):
+    s, e = date(2020, 1, 1), date(2020, 1, 10)
+    old, stored = _old(s, e)
+    payload = asyncio.run(records.derive_payload(old, {**old, "input_location": "Oslo"}, stored))
+    assert payload["resolved"]["name"] == "Oslo, NO"
+    assert upstream == [(s, e)]
+
+
+def test_unchanged_record_is_left_alone(upstream):
+    old, stored = _old(date(2020, 1, 1), date(2020, 1, 10))
+    assert asyncio.run(records.derive_payload(old, {**old, "input_location": " madrid "}, stored)) is None
+
+
+def test_extension_refetches_recent_days_instead_of_reusing_them(upstream):
+    s, e = TODAY - timedelta(days=20), TODAY + timedelta(days=2)  # stored while the tail was forecast
+    old, stored = _old(s, e)
+    new = {**old, "end_date": TODAY + timedelta(days=5)}
+    payload = asyncio.run(records.derive_payload(old, new, stored))
+
+    settled = TODAY - timedelta(days=settings.ARCHIVE_LAG_DAYS + 1)
+    assert upstream == [(settled + timedelta(days=1), new["end_date"])]
+    series = DailySeries.from_daily(payload["daily"])
+    assert len(series) == (new["end_date"] - s).days + 1
+    values = dict(zip(payload["daily"]["time"], payload["daily"]["temperature_2m_max"]))
+    assert values[settled.isoformat()] == 1.0                          # settled: reused
+    assert values[(settled + timedelta(days=1)).isoformat()] == 99.0   # recent: refetched
+
+
+def test_patch_endpoint_updates_resolved_fields(client, make_record, upstream):
+    s, e = date(2020, 1, 1), date(2020, 1, 10)
+    _, stored = _old(s, e)
+    rid = make_record(start_date=s, end_date=e, result_payload=stored)
+    r = client.patch(f"/records/{rid}", json={"input_location": "Puerta del Sol"})
+    assert r.status_code == 200
+    assert (r.json()["resolved_name"], r.json()["lat"]) == ("Puerta del Sol, ES", 40.4169)
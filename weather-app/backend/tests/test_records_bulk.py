@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.db import SessionLocal
+from app.models import QueryRecord
+
+
+def _count() -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(QueryRecord))
+
+
+@pytest.mark.parametrize("query", ["", "?kind=", "?name_prefix=", "?kind=&name_prefix="])
+def test_bulk_delete_without_a_real_filter_deletes_nothing(client, make_record, query):
+    make_record()
+    make_record(resolved_name="Oslo, NO")
+    r = client.delete(f"/records/bulk{query}")
+    assert r.status_code == 422
+    assert _count() == 2
+
+
+def test_bulk_delete_by_filter_and_ids(client, make_record):
+    madrid = make_record()
+    oslo = make_record(resolved_name="Oslo, NO")
+    current = make_record(kind="current")
+
+    r = client.delete("/records/bulk", params={"name_prefix": "Oslo"})
+    assert r.status_code == 200 and r.json()["ids"] == [oslo]
+
+    r = client.delete("/records/bulk", params={"ids": [madrid, 999999], "kind": "range"})
+    assert r.json() == {"deleted": 1, "ids": [madrid], "missing": [999999]}
+    assert _count() == 1  # the 'current' record survives
+    assert client.get(f"/records/{current}").status_code == 200
+
+
+def test_bulk_create_reports_bad_items_per_item(client, make_record, monkeypatch):
+    from app.routers import records
+
+    async def payload(body):
+        if body.input_location == "Nowhere":
+            raise KeyError("daily")  # an unexpected error: only this item fails
+        return {"resolved": {"name": body.input_location, "lat": 1.0, "lon": 2.0}, "daily": {"time": []}}
+
+    monkeypatch.setattr(records, "create_payload", payload)
+    items = [{"input_location": loc, "start_date": "2020-01-01", "end_date": "2020-01-02"}
+             for loc in ("Lima", "Nowhere", "Quito")]
+    r = client.post("/records/bulk", json=items)
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["ok"], body["failed"]) == (2, 1)
+    assert body["results"][1]["status"] == 500
+    assert _count() == 2
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+def _slow(result, delay=0.05, calls=None):
+    async def fn():
+        if calls is not None:
+            calls.append(result)
+        await asyncio.sleep(delay)
+        return result
+    return fn
+
+
+def test_followers_share_leader_result():
+    sf = SingleFlight()
+    calls = []
+
+    async def main():
+        return await asyncio.gather(*(sf.do("k", _slow("v", calls=calls)) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["v"] * 5
+    assert calls == ["v"]
+    assert sf.stats() == {"calls": 1, "coalesced": 4}
+
+
+def test_leader_error_reaches_followers():
+    sf = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream")
+
+    async def main():
+        return await asyncio.gather(sf.do("k", boom), sf.do("k", boom), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert sf.calls == 1
+
+
+def test_leader_cancel_does_not_cancel_followers():
+    sf = SingleFlight()
+    calls = []
+
+    async def main():
+        leader = asyncio.create_task(asyncio.wait_for(sf.do("k", _slow("a", 0.2, calls)), 0.05))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(sf.do("k", _slow("b", 0.05, calls)))
+        with pytest.raises(asyncio.TimeoutError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "b"  # the follower re-ran its own call
+    assert calls == ["a", "b"]
+
+
+def test_leader_cancel_elects_one_new_leader():
+    sf = SingleFlight()
+    calls = []
+
+    async def main():
+        leader = asyncio.create_task(sf.do("k", _slow("a", 0.2, calls)))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(sf.do("k", _slow("b", 0.05, calls))) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(main()) == ["b"] * 3
+    assert calls == ["a", "b"]
+
+
+def test_nothing_cached_after_completion():
+    sf = SingleFlight()
+
+    async def main():
+        first = await sf.do("k", _slow(1, 0))
+        second = await sf.do("k", _slow(2, 0))
+        return first, second
+
+    assert asyncio.run(main()) == (1, 2)
+    assert sf.coalesced == 0
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from app.config import settings
+from app.routers import weather
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    async def geocode(q):
+        return None if q == "Atlantis" else {"name": q, "lat": 1.0, "lon": 2.0}
+
+    async def fetch_range(g, s, e, allow_partial=False):
+        if g["name"] == "Broken":
+            raise ValueError("Expecting value: line 1 column 1")  # e.g. bad upstream JSON
+        return {"payload": {"resolved": g, "daily": {"time": [s.isoformat()]}}, "timing": {}}
+
+    monkeypatch.setattr(weather, "base_geocode", geocode)
+    monkeypatch.setattr(weather, "fetch_range", fetch_range)
+
+
+def _lines(r) -> dict[str, dict]:
+    return {d["input_location"]: d for d in map(json.loads, r.text.splitlines())}
+
+
+def test_bad_items_become_error_lines(client, upstream):
+    items = [{"input_location": loc, "start_date": "2020-01-01", "end_date": "2020-01-03"}
+             for loc in ("Lima", "Atlantis", "Broken", "lima")]
+    items.append({"input_location": "Quito", "start_date": "2020-02-01", "end_date": "2020-01-01"})
+    r = client.post("/weather/range/batch", json=items)
+    assert r.status_code == 200
+    lines = _lines(r)
+    assert lines["Lima"]["ok"] and lines["Lima"]["indices"] == [0, 3]
+    assert (lines["Atlantis"]["ok"], lines["Atlantis"]["status"]) == (False, 404)
+    assert (lines["Broken"]["ok"], lines["Broken"]["status"]) == (False, 500)
+    assert (lines["Quito"]["ok"], lines["Quito"]["status"], lines["Quito"]["indices"]) == (False, 400, [4])
+
+
+def test_batch_size_is_capped(client, upstream, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_ITEMS", 2)
+    item = {"input_location": "Lima", "start_date": "2020-01-01", "end_date": "2020-01-03"}
+    assert client.post("/weather/range/batch", json=[item] * 3).status_code == 400
+    assert client.post("/weather/range/batch", json=[item] * 2).status_code == 200
@@ -0,0 +1,28 @@
+import pytest
+
+from app.routers import weather
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    async def current(lat, lon):
+        return {"current": {"temperature_2m": None, "time": "2026-01-01T00:00"}}
+
+    async def forecast(lat, lon, days=5):
+        return {"daily": {"time": ["2026-01-01"], "temperature_2m_max": [None]}}
+
+    monkeypatch.setattr(weather, "get_current_weather", current)
+    monkeypatch.setattr(weather, "get_daily_forecast", forecast)
+    monkeypatch.setattr(weather, "current_cache", weather.LRUCache(maxsize=8))
+    monkeypatch.setattr(weather, "forecast_cache", weather.LRUCache(maxsize=8))
+
+
+@pytest.mark.parametrize("path", ["/weather/current", "/weather/forecast"])
+def test_range_only_fields_are_left_out(client, upstream, path):
+    body = client.get(path, params={"lat": 1.0, "lon": 2.0}).json()
+    assert list(body) == ["payload"]
+
+
+def test_payload_nulls_survive(client, upstream):
+    body = client.get("/weather/forecast", params={"lat": 1.0, "lon": 2.0}).json()
+    assert body["payload"]["daily"]["temperature_2m_max"] == [None]
@@ -0,0 +1,32 @@
+import pytest
+
+from app.routers import weather
+from app.timeseries import DailySeries
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    async def geocode(q):
+        return {"name": q, "lat": 1.0, "lon": 2.0}
+
+    async def fetch_days(lat, lon, s, e, source):
+        return DailySeries.from_daily({
+            "time": ["2020-01-01", "2020-01-02", "2020-02-01"],
+            "temperature_2m_max": [1.0, 3.0, None],
+        })
+
+    monkeypatch.setattr(weather, "base_geocode", geocode)
+    monkeypatch.setattr(weather, "fetch_days", fetch_days)
+    monkeypatch.setattr(weather, "stats_cache", weather.LRUCache(maxsize=8))
+
+
+def test_counts_are_ints_and_empty_groups_null(client, upstream):
+    r = client.get("/weather/stats", params={"location": "Lima", "start_date": "2020-01-01",
+                                             "end_date": "2020-02-29", "variables": "temperature_2m_max"})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["groups"] == [1, 2]
+    t = body["stats"]["temperature_2m_max"]
+    assert t["count"] == [2, 0] and all(type(c) is int for c in t["count"])
+    assert (t["mean"], t["min"], t["max"]) == ([2.0, None], [1.0, None], [3.0, None])
+    assert set(t) == {"count", "mean", "min", "max", "p10", "p50", "p90", "anomaly"}
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Latency/throughput benchmark for the weather backend against a fake Open-Meteo.
+
+By default it starts tools/fake_openmeteo.py and a backend (uvicorn app.main:app)
+on a throwaway SQLite DB, runs each scenario at each concurrency level and
+prints a JSON report with p50/p95/p99 latency and req/s.
+
+Usage (from backend/):
+  python tools/bench.py                                   # all scenarios, default levels
+  python tools/bench.py --scenarios current,range_crossing --concurrency 1,16,64
+  python tools/bench.py --rows 20000 --output bench.json  # record_list over 20k rows
+  python tools/bench.py --backend http://127.0.0.1:8000   # use an already running backend
+
+Scenarios:
+  current         GET  /weather/current
+  forecast        GET  /weather/forecast
+  range_crossing  POST /weather/range  (range crossing today: archive + forecast legs)
+  record_create   POST /records
+  record_list     GET  /records        (after seeding --rows records)
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SCENARIOS = ["current", "forecast", "range_crossing", "record_create", "record_list"]
+
+
+# ---------- scenarios: each returns one request to send ----------
+def _location(rng: random.Random, distinct: int) -> str:
+    return f"Benchtown {rng.randrange(distinct)}"
+
+
+def _coords(rng: random.Random, distinct: int) -> dict:
+    i = rng.randrange(distinct)
+    return {"lat": round(-60 + (i * 7.31) % 120, 4), "lon": round(-170 + (i * 13.7) % 340, 4)}
+
+
+def build_request(scenario: str, rng: random.Random, distinct: int) -> tuple[str, str, dict]:
+    today = date.today()
+    if scenario == "current":
+        return "GET", "/weather/current", {"params": _coords(rng, distinct)}
+    if scenario == "forecast":
+        return "GET", "/weather/forecast", {"params": {**_coords(rng, distinct), "days": 5}}
+    if scenario == "range_crossing":
+        body = {"input_location": _location(rng, distinct),
+                "start_date": str(today - timedelta(days=10)), "end_date": str(today + timedelta(days=3))}
+        return "POST", "/weather/range", {"json": body}
+    if scenario == "record_create":
+        s = today - timedelta(days=rng.randrange(30, 400))
+        body = {"input_location": _location(rng, distinct), "start_date": str(s), "end_date": str(s + timedelta(days=14))}
+        return "POST", "/records/", {"json": body}
+    if scenario == "record_list":
+        return "GET", "/records/", {"params": {"limit": 100}}
+    raise ValueError(f"unknown scenario {scenario}")
+
+
+# ---------- measurement ----------
+def percentile(sorted_vals: list[float], p: float) -> float:
+    if not sorted_vals:
+        return float("nan")
+    k = (len(sorted_vals) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+async def run_level(client: httpx.AsyncClient, scenario: str, concurrency: int, total: int,
+                    distinct: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    requests_ = [build_request(scenario, rng, distinct) for _ in range(total)]
+    latencies: list[float] = []
+    errors = 0
+    it = iter(requests_)
+
+    async def worker():
+        nonlocal errors
+        for method, path, kwargs in it:
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, path, **kwargs)
+                ok = r.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append((time.perf_counter() - t0) * 1000)
+            errors += not ok
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    lat = sorted(latencies)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / wall, 1),
+        "mean_ms": round(sum(lat) / len(lat), 2),
+        "p50_ms": round(percentile(lat, 50), 2),
+        "p95_ms": round(percentile(lat, 95), 2),
+        "p99_ms": round(percentile(lat, 99), 2),
+    }
+
+
+# ---------- local servers ----------
+def wait_http(url: str, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def seed_records(db_path: str, rows: int) -> None:
+    conn = sqlite3.connect(db_path)
+    now = datetime.utcnow()
+    conn.executemany(
+        "INSERT INTO queries (input_location, resolved_name, lat, lon, kind, start_date, end_date, result_payload, created_at) "
+        "VALUES (?, ?, ?, ?, 'range', ?, ?, ?, ?)",
+        [
+            (f"Seed {i}", f"Seed {i}, ZZ", 10.0, 20.0, "2024-01-01", "2024-01-31",
+             json.dumps({"daily": {"time": [f"2024-01-{d:02d}" for d in range(1, 32)],
+                                   "temperature_2m_max": [20.5] * 31}}),
+             (now - timedelta(seconds=i)).isoformat(sep=" "))
+            for i in range(rows)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def start_servers(args, workdir: str) -> tuple[list[subprocess.Popen], str, str]:
+    fake_port, backend_port = args.fake_port, args.backend_port
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    db_path = os.path.join(workdir, "bench.db")
+    procs = [subprocess.Popen([
+        sys.executable, str(BACKEND_DIR / "tools" / "fake_openmeteo.py"), "--port", str(fake_port),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms), "--error-rate", str(args.error_rate),
+    ])]
+    env = {
+        **os.environ,
+        "DB_URL": f"sqlite:///{db_path}",
+        "GEOCODE_URL": f"{fake_url}/v1/search",
+        "FORECAST_URL": f"{fake_url}/v1/forecast",
+        "ARCHIVE_URL": f"{fake_url}/v1/archive",
+        "IPAPI_URL": f"{fake_url}/json/",
+    }
+    procs.append(subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(backend_port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    ))
+    backend_url = f"http://127.0.0.1:{backend_port}"
+    wait_http(f"{fake_url}/json/")
+    wait_http(f"{backend_url}/health")
+    return procs, backend_url, db_path
+
+
+async def main_async(args, backend_url: str) -> list[dict]:
+    results = []
+    limits = httpx.Limits(max_connections=max(args.concurrency) * 2, max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=backend_url, timeout=60, limits=limits) as client:
+        for scenario in args.scenarios:
+            for c in args.concurrency:
+                # warm-up pass so connection setup and first-touch caches are not measured
+                await run_level(client, scenario, c, min(args.requests, c * 2), args.distinct, seed=0)
+                res = await run_level(client, scenario, c, args.requests, args.distinct, seed=c)
+                print(json.dumps(res), file=sys.stderr)
+                results.append(res)
+    return results
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark the weather backend against a fake Open-Meteo")
+    p.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenario names")
+    p.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    p.add_argument("--requests", type=int, default=200, help="Requests per scenario and level")
+    p.add_argument("--distinct", type=int, default=50, help="Distinct locations to spread requests over")
+    p.add_argument("--rows", type=int, default=1000, help="Records seeded before record_list")
+    p.add_argument("--latency-ms", type=float, default=50.0)
+    p.add_argument("--jitter-ms", type=float, default=10.0)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned backend")
+    p.add_argument("--fake-port", type=int, default=8765)
+    p.add_argument("--backend-port", type=int, default=8766)
+    p.add_argument("--backend", help="Benchmark this running backend instead of spawning one")
+    p.add_argument("--output", help="Also write the JSON report to this file")
+    args = p.parse_args()
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        p.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    procs = []
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            if args.backend:
+                backend_url = args.backend
+            else:
+                procs, backend_url, db_path = start_servers(args, workdir)
+                if "record_list" in args.scenarios and args.rows:
+                    seed_records(db_path, args.rows)
+            results = asyncio.run(main_async(args, backend_url))
+        finally:
+            for proc in procs:
+                proc.terminate()
+            for proc in procs:
+                proc.wait(timeout=10)
+
+    report = {
+        "meta": {
+            "when": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "backend": args.backend or "spawned",
+            "upstream_latency_ms": args.latency_ms,
+            "upstream_jitter_ms": args.jitter_ms,
+            "upstream_error_rate": args.error_rate,
+            "requests_per_level": args.requests,
+            "seeded_rows": args.rows if "record_list" in args.scenarios else 0,
+        },
+        "results": results,
+    }
+    out = json.dumps(report, indent=2)
+    print(out)
+    if args.output:
+        Path(args.output).write_text(out + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
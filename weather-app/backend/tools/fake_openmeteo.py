@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Open-Meteo geocoding/forecast/archive APIs and ipapi.co.
+
+Serves deterministic, plausible payloads with configurable latency, jitter and
+error rate, so the backend can be load-tested without touching the real APIs.
+
+Usage:
+  python tools/fake_openmeteo.py --port 8765 --latency-ms 80 --jitter-ms 20 --error-rate 0.01
+
+Point the backend at it with:
+  GEOCODE_URL=http://127.0.0.1:8765/v1/search
+  FORECAST_URL=http://127.0.0.1:8765/v1/forecast
+  ARCHIVE_URL=http://127.0.0.1:8765/v1/archive
+  IPAPI_URL=http://127.0.0.1:8765/json/
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+from datetime import date, datetime, timedelta
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+ARGS = argparse.Namespace(latency_ms=50.0, jitter_ms=10.0, error_rate=0.0)
+app = FastAPI(title="Fake Open-Meteo")
+
+
+async def _simulate():
+    """Sleeps for the configured latency; returns an error response with probability error_rate."""
+    delay = max(0.0, random.gauss(ARGS.latency_ms, ARGS.jitter_ms)) / 1000
+    await asyncio.sleep(delay)
+    if random.random() < ARGS.error_rate:
+        return JSONResponse({"error": True, "reason": "simulated failure"}, status_code=503)
+    return None
+
+
+def _coords(name: str) -> tuple[float, float]:
+    h = hashlib.sha1(name.strip().lower().encode()).digest()
+    lat = int.from_bytes(h[:4], "big") / 2**32 * 140 - 70
+    lon = int.from_bytes(h[4:8], "big") / 2**32 * 360 - 180
+    return round(lat, 4), round(lon, 4)
+
+
+def _daily(lat: float, lon: float, s: date, e: date, variables: list[str]) -> dict:
+    n = (e - s).days + 1
+    days = [s + timedelta(days=i) for i in range(n)]
+    out = {"time": [d.isoformat() for d in days]}
+    for v in variables:
+        vals = []
+        for d in days:
+            seed = d.toordinal() * 31 + int(lat * 100) + int(lon * 10)
+            if v == "weathercode":
+                vals.append([0, 1, 2, 3, 45, 61, 80, 95][seed % 8])
+            elif v == "precipitation_sum":
+                vals.append(round((seed % 97) / 10, 1))
+            elif v == "temperature_2m_min":
+                vals.append(round(5 + (seed % 150) / 10, 1))
+            else:
+                vals.append(round(15 + (seed % 200) / 10, 1))
+        out[v] = vals
+    return out
+
+
+@app.get("/v1/search")
+async def search(name: str, count: int = 1):
+    if (err := await _simulate()) is not None:
+        return err
+    if name.lower().startswith("nowhere"):
+        return {"generationtime_ms": 0.1}
+    lat, lon = _coords(name)
+    return {"results": [{"name": name.title(), "country_code": "ZZ", "latitude": lat, "longitude": lon}]}
+
+
+@app.get("/v1/forecast")
+async def forecast(request: Request, latitude: float, longitude: float):
+    if (err := await _simulate()) is not None:
+        return err
+    q = request.query_params
+    if q.get("current_weather"):
+        return {"latitude": latitude, "longitude": longitude, "current_weather": {
+            "temperature": 21.3, "windspeed": 9.4, "winddirection": 180, "weathercode": 2,
+            "time": datetime.utcnow().strftime("%Y-%m-%dT%H:00"),
+        }}
+    s = date.fromisoformat(q["start_date"]) if "start_date" in q else date.today()
+    e = date.fromisoformat(q["end_date"]) if "end_date" in q else s + timedelta(days=6)
+    variables = (q.get("daily") or "").split(",")
+    return {"latitude": latitude, "longitude": longitude, "daily": _daily(latitude, longitude, s, e, variables)}
+
+
+@app.get("/v1/archive")
+async def archive(request: Request, latitude: float, longitude: float, start_date: date, end_date: date):
+    if (err := await _simulate()) is not None:
+        return err
+    variables = (request.query_params.get("daily") or "").split(",")
+    return {"latitude": latitude, "longitude": longitude,
+            "daily": _daily(latitude, longitude, start_date, end_date, variables)}
+
+
+@app.get("/json/")
+async def ipapi():
+    if (err := await _simulate()) is not None:
+        return err
+    return {"latitude": 30.2672, "longitude": -97.7431, "city": "Austin", "country": "US"}
+
+
+def main():
+    import uvicorn
+
+    p = argparse.ArgumentParser(description="Fake Open-Meteo + ipapi server for benchmarks")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--latency-ms", type=float, default=50.0, help="Mean added latency per request")
+    p.add_argument("--jitter-ms", type=float, default=10.0, help="Std deviation of the added latency")
+    p.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = p.parse_args()
+    ARGS.latency_ms, ARGS.jitter_ms, ARGS.error_rate = args.latency_ms, args.jitter_ms, args.error_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
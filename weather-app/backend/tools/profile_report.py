@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Aggregate per-request profiles written by the profiling middleware (PROFILE_DIR).
+
+Merges every <id>.prof into one pstats view and prints the hottest functions,
+plus per-route request counts and mean Server-Timing breakdowns from the
+<id>.json sidecars.
+
+Usage (from backend/):
+  python tools/profile_report.py                          # ./profiles, top 25 by own time
+  python tools/profile_report.py --dir /tmp/profiles --route /weather/range
+  python tools/profile_report.py --sort cumulative --top 40
+  python tools/profile_report.py --json report.json
+  python tools/profile_report.py --collapsed stacks.txt   # caller;callee pairs for flamegraph tools
+
+This script uses only the Python stdlib.
+"""
+import argparse
+import json
+import pstats
+from collections import defaultdict
+from pathlib import Path
+
+
+def load_meta(directory: Path, route: str | None) -> list[tuple[Path, dict]]:
+    out = []
+    for meta_path in sorted(directory.glob("*.json")):
+        prof = meta_path.with_suffix(".prof")
+        if not prof.exists():
+            continue
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if route and meta.get("route") != route:
+            continue
+        out.append((prof, meta))
+    return out
+
+
+def route_summary(metas: list[dict]) -> list[dict]:
+    groups: dict[tuple, list[dict]] = defaultdict(list)
+    for m in metas:
+        groups[(m["method"], m["route"])].append(m)
+    rows = []
+    for (method, route), items in sorted(groups.items(), key=lambda kv: -len(kv[1])):
+        parts: dict[str, float] = defaultdict(float)
+        for m in items:
+            for k, v in m["timings_ms"].items():
+                parts[k] += v
+        rows.append({
+            "method": method,
+            "route": route,
+            "requests": len(items),
+            "mean_ms": {k: round(v / len(items), 2) for k, v in sorted(parts.items(), key=lambda kv: -kv[1])},
+        })
+    return rows
+
+
+def hot_functions(stats: pstats.Stats, sort: str, top: int, n_requests: int) -> list[dict]:
+    col = {"calls": 3, "tottime": 4, "cumulative": 5}[sort]
+    rows = [(filename, line, func, nc, tt, ct)
+            for (filename, line, func), (cc, nc, tt, ct, _callers) in stats.stats.items()]
+    rows.sort(key=lambda r: r[col], reverse=True)
+    return [
+        {
+            "function": _label((f, line, func)),
+            "calls": nc,
+            "tottime_ms": round(tt * 1000, 2),
+            "cumtime_ms": round(ct * 1000, 2),
+            "per_request_ms": round(tt * 1000 / n_requests, 3),
+        }
+        for f, line, func, nc, tt, ct in rows[:top]
+    ]
+
+
+def _label(key: tuple) -> str:
+    f, line, func = key
+    return f"{Path(f).name}:{line}({func})" if line else func
+
+
+def write_collapsed(stats: pstats.Stats, path: str) -> None:
+    """
+    Collapsed-stack lines ("caller;callee microseconds"). cProfile only keeps
+    one level of callers, so each line is a two-frame stack weighted by the
+    time the callee spent when called from that caller.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for callee, (_cc, _nc, _tt, _ct, callers) in stats.stats.items():
+            for caller, edge in callers.items():
+                tt = edge[2] if isinstance(edge, tuple) else 0.0
+                if tt > 0:
+                    f.write(f"{_label(caller)};{_label(callee)} {int(tt * 1e6)}\n")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Top hot functions across profiled requests")
+    p.add_argument("--dir", default="profiles", help="PROFILE_DIR to read")
+    p.add_argument("--route", help="Only requests whose route template matches exactly")
+    p.add_argument("--sort", choices=["tottime", "cumulative", "calls"], default="tottime")
+    p.add_argument("--top", type=int, default=25)
+    p.add_argument("--json", help="Write the report as JSON to this file instead of printing tables")
+    p.add_argument("--collapsed", help="Also write caller;callee collapsed stacks to this file")
+    args = p.parse_args()
+
+    found = load_meta(Path(args.dir), args.route)
+    if not found:
+        print(f"No profiles found in {args.dir}" + (f" for route {args.route}" if args.route else ""))
+        return
+
+    stats = pstats.Stats(str(found[0][0]))
+    for prof, _ in found[1:]:
+        stats.add(str(prof))
+    report = {
+        "profiles": len(found),
+        "routes": route_summary([m for _, m in found]),
+        "hot_functions": hot_functions(stats, args.sort, args.top, len(found)),
+    }
+
+    if args.collapsed:
+        write_collapsed(stats, args.collapsed)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Wrote {args.json}")
+        return
+
+    print(f"{report['profiles']} profiled requests\n")
+    for r in report["routes"]:
+        breakdown = ", ".join(f"{k}={v}" for k, v in r["mean_ms"].items())
+        print(f"{r['method']:6} {r['route']:32} n={r['requests']:<5} {breakdown}")
+    print(f"\nTop {args.top} by {args.sort}:")
+    print(f"{'calls':>10} {'tottime ms':>12} {'cumtime ms':>12} {'ms/req':>9}  function")
+    for h in report["hot_functions"]:
+        print(f"{h['calls']:>10} {h['tottime_ms']:>12} {h['cumtime_ms']:>12} {h['per_request_ms']:>9}  {h['function']}")
+
+
+if __name__ == "__main__":
+    main()
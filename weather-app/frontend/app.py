@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 from datetime import date, datetime
 from io import BytesIO
@@ -7,6 +8,7 @@ from typing import Optional, Tuple
 import streamlit.components.v1 as components
 from fpdf import FPDF
 import json
+import time
 import urllib.parse
 
 # ---------- Config ----------
@@ -43,23 +45,88 @@ def icon_and_label_from_code(code: int) -> Tuple[str, str]:
     return "❓", "Unknown"
 
 # ---------- Backend helpers ----------
-def api(path: str, params=None, method="GET", json_body=None, timeout=20):
+@st.cache_resource
+def http_session() -> requests.Session:
+    # one keep-alive pool for every backend call, shared across reruns and sessions
+    sess = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    sess.mount("http://", adapter)
+    sess.mount("https://", adapter)
+    return sess
+
+def _request(path: str, params=None, method="GET", json_body=None, timeout=20):
     url = f"{BACKEND}{path}"
-    if method == "GET":
-        r = requests.get(url, params=params, timeout=timeout)
-    elif method == "POST":
-        r = requests.post(url, params=params, json=json_body, timeout=timeout)
-    elif method == "PATCH":
-        r = requests.patch(url, params=params, json=json_body, timeout=timeout)
-    elif method == "DELETE":
-        r = requests.delete(url, params=params, timeout=timeout)
-    else:
+    if method not in ("GET", "POST", "PATCH", "DELETE"):
         raise ValueError("unsupported method")
+    r = http_session().request(method, url, params=params, json=json_body, timeout=timeout)
     if r.status_code == 404:
         return None
     r.raise_for_status()
     return r.json()
 
+# Read-only GETs are cached per (path, params); TTL depends on how fast the data changes.
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
+def _get_geocode(path: str, params: tuple, timeout: int):
+    return _request(path, dict(params), timeout=timeout)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _get_live(path: str, params: tuple, timeout: int):
+    return _request(path, dict(params), timeout=timeout)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _get_records(path: str, params: tuple, timeout: int):
+    return _request(path, dict(params), timeout=timeout)
+
+CACHED_GETS = [
+    ("/weather/geocode", _get_geocode),
+    ("/weather/current", _get_live),
+    ("/weather/forecast", _get_live),
+    ("/records", _get_records),
+]
+
+def api(path: str, params=None, method="GET", json_body=None, timeout=20):
+    if method == "GET":
+        for prefix, cached in CACHED_GETS:
+            if path.startswith(prefix):
+                return cached(path, tuple(sorted((params or {}).items())), timeout)
+        return _request(path, params, timeout=timeout)
+    out = _request(path, params, method, json_body, timeout)
+    if path.startswith("/records"):
+        _get_records.clear()  # writes invalidate every cached records read
+    return out
+
+def run_job(path: str, body: dict, label: str, poll: float = 0.5, timeout: float = 600):
+    """POST a /jobs endpoint and poll it with a progress bar; returns the job result, None if it failed."""
+    job = api(path, method="POST", json_body=body)
+    bar = st.progress(0.0, text=label)
+    deadline = time.monotonic() + timeout
+    while job["status"] in ("queued", "running") and time.monotonic() < deadline:
+        time.sleep(poll)
+        job = _request(f"/jobs/{job['id']}", {"include_result": False})
+        bar.progress(job["progress"], text=job.get("message") or label)
+    bar.empty()
+    if job["status"] == "failed":
+        st.error(f"Job failed: {job['error']}")
+        return None
+    if job["status"] != "done":
+        st.error(f"Job {job['id']} still {job['status']}; check back later.")
+        return None
+    return _request(f"/jobs/{job['id']}")["result"]
+
+def list_all_records(page_size: int = 500):
+    # /records is keyset-paginated; follow X-Next-Cursor until the last page
+    rows, cursor = [], None
+    while True:
+        params = {"limit": page_size}
+        if cursor:
+            params["cursor"] = cursor
+        r = http_session().get(f"{BACKEND}/records", params=params, timeout=20)
+        r.raise_for_status()
+        rows.extend(r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return rows
+
 
 # Tech Assessment 1 — Live Weather 
 # -----------------------------------------------------------
@@ -191,10 +258,9 @@ with tab_create:
             st.stop()
         try:
             body = {"input_location": create_loc.strip(), "start_date": str(start_d), "end_date": str(end_d)}
-            # call range to validate and get payload
-            resp = api("/weather/range", method="POST", json_body=body)
+            # fetch the range as a background job (multi-year ranges take a while) to validate and get payload
+            resp = run_job("/jobs/range", body, "Fetching range...")
             if resp is None:
-                st.error("Create failed: location not found or backend returned 404")
                 st.stop()
             payload = resp.get("payload")
             if payload is None:
@@ -210,6 +276,7 @@ with tab_create:
                 "lat": payload.get("resolved", {}).get("lat"),
                 "lon": payload.get("resolved", {}).get("lon"),
                 "result_payload": payload,
+                "payload_token": resp.get("token"),  # lets the backend skip re-fetching this payload
             }
             rec = api("/records", method="POST", json_body=body2)
             st.success(f"Saved record #{rec['id']} ✅")
@@ -223,7 +290,7 @@ with tab_create:
 with tab_read:
     st.subheader("Browse saved records")
     try:
-        rows = api("/records")
+        rows = api("/records", params={"limit": 200})  # newest 200
     except Exception as e:
         rows = []
         st.error(f"Read failed: {e}")
@@ -254,8 +321,7 @@ with tab_read:
             rid = sel[0]
             try:
                 rfull = api(f"/records/{rid}")
-                # We only stored a subset of fields in the RecordOut, fetch payload with a second call if needed
-                # It just display record fields, payload is large and already visible at creation time.
+                # RecordOut carries only the record fields; the (large) payload has its own endpoint below.
                 # react-json-view (used by st.json) expects a JSON object/array as src.
                 # If the backend returns a string or other type, render safely.
                 if isinstance(rfull, (dict, list)):
@@ -269,6 +335,13 @@ with tab_read:
                             st.text(str(rfull))
                     except Exception:
                         st.text(str(rfull))
+                if st.checkbox("Show stored daily data", key="read_show_payload"):
+                    stored = api(f"/records/{rid}/payload")
+                    daily = (stored or {}).get("payload", {}).get("daily")
+                    if daily:
+                        st.dataframe(pd.DataFrame(daily), use_container_width=True)
+                    else:
+                        st.info("No daily data stored for this record.")
             except Exception as e:
                 st.error(f"Fetch record failed: {e}")
 
@@ -406,10 +479,39 @@ with tab_integrations:
                 st.error(f"Map error: {e}")
 
 # -------------------- EXPORT --------------------
+# CSV / JSON / NDJSON / XML / Parquet are streamed by the backend (GET /records/export);
+# nothing is built until the user asks for a file.
+SERVER_EXPORTS = {
+    "CSV": ("csv", "text/csv"),
+    "JSON": ("json", "application/json"),
+    "NDJSON": ("ndjson", "application/x-ndjson"),
+    "XML": ("xml", "application/xml"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+def records_pdf(rows) -> bytes:
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=12)
+    pdf.add_page()
+    pdf.set_font("Arial", size=11)
+    pdf.cell(0, 8, "Weather Records", ln=1)
+    headers = ["id","created_at","input_location","resolved_name","lat","lon","kind","start_date","end_date"]
+    colw = [10, 36, 34, 34, 16, 16, 18, 22, 22]
+    for h, w in zip(headers, colw):
+        pdf.cell(w, 8, h, border=1)
+    pdf.ln(8)
+    for r in rows:
+        cells = [str(r.get(h, "")) for h in headers]
+        for text, w in zip(cells, colw):
+            text = (text[:int(w*1.6)] + "…") if len(text) > int(w*1.6) else text
+            pdf.cell(w, 8, text, border=1)
+        pdf.ln(8)
+    return pdf.output(dest="S").encode("latin1", "ignore")
+
 with tab_export:
     st.subheader("Export saved records")
     try:
-        rows = api("/records")
+        rows = api("/records", params={"limit": 200})
     except Exception as e:
         rows = []
         st.error(f"Load failed: {e}")
@@ -427,56 +529,35 @@ with tab_export:
             "start_date": r["start_date"],
             "end_date": r["end_date"],
         } for r in rows])
+        st.caption("Newest 200 records shown; exports include every record.")
         st.dataframe(df, use_container_width=True)
 
-        # JSON
-        json_bytes = json.dumps(rows, ensure_ascii=False, indent=2).encode("utf-8")
-        st.download_button("Download JSON", json_bytes, file_name="weather_records.json", mime="application/json")
-
-        # CSV
-        csv_bytes = df.to_csv(index=False).encode("utf-8")
-        st.download_button("Download CSV", csv_bytes, file_name="weather_records.csv", mime="text/csv")
+        e1, e2 = st.columns(2)
+        with e1:
+            fmt = st.selectbox("Format", list(SERVER_EXPORTS) + ["Markdown", "PDF"], key="export_fmt")
+        with e2:
+            expand = st.checkbox("One row per day (include daily data)", key="export_expand",
+                                 disabled=fmt not in SERVER_EXPORTS)
 
-        # Markdown
-        try:
-            md = df.to_markdown(index=False)
-            st.download_button("Download Markdown", md.encode("utf-8"), file_name="weather_records.md", mime="text/markdown")
-        except Exception as e:
-            st.warning(f"Markdown export needs 'tabulate'. Error: {e}")
-
-        # XML
-        def to_xml(rows_dict):
-            from xml.sax.saxutils import escape
-            parts = ["<records>"]
-            for row in rows_dict:
-                parts.append("  <record>")
-                for k, v in row.items():
-                    parts.append(f"    <{k}>{escape(str(v))}</{k}>")
-                parts.append("  </record>")
-            parts.append("</records>")
-            return "\n".join(parts)
-        xml_str = to_xml(rows).encode("utf-8")
-        st.download_button("Download XML", xml_str, file_name="weather_records.xml", mime="application/xml")
-
-        # PDF simple table
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=12)
-        pdf.add_page()
-        pdf.set_font("Arial", size=11)
-        pdf.cell(0, 8, "Weather Records", ln=1)
-        headers = ["id","created_at","input_location","resolved_name","lat","lon","kind","start_date","end_date"]
-        colw = [10, 36, 34, 34, 16, 16, 18, 22, 22]
-        for h, w in zip(headers, colw):
-            pdf.cell(w, 8, h, border=1)
-        pdf.ln(8)
-        for r in rows:
-            cells = [str(r.get(h, "")) for h in headers]
-            for text, w in zip(cells, colw):
-                text = (text[:int(w*1.6)] + "…") if len(text) > int(w*1.6) else text
-                pdf.cell(w, 8, text, border=1)
-            pdf.ln(8)
-        pdf_bytes = pdf.output(dest="S").encode("latin1", "ignore")
-        st.download_button("Download PDF", pdf_bytes, file_name="weather_records.pdf", mime="application/pdf")
+        if st.button("Prepare download"):
+            try:
+                if fmt in SERVER_EXPORTS:
+                    ext, mime = SERVER_EXPORTS[fmt]
+                    r = http_session().get(f"{BACKEND}/records/export", params={"format": ext, "expand": expand}, timeout=120)
+                    r.raise_for_status()
+                    data = r.content
+                elif fmt == "Markdown":
+                    ext, mime = "md", "text/markdown"
+                    all_df = pd.DataFrame(list_all_records())
+                    data = all_df.to_markdown(index=False).encode("utf-8")
+                else:
+                    ext, mime = "pdf", "application/pdf"
+                    data = records_pdf(list_all_records())
+                st.download_button(f"Download {fmt}", data, file_name=f"weather_records.{ext}", mime=mime)
+            except ImportError as e:
+                st.warning(f"Markdown export needs 'tabulate'. Error: {e}")
+            except Exception as e:
+                st.error(f"Export failed: {e}")
 
 st.markdown("---")
 